@@ -5,17 +5,30 @@ This module contains the main class for interacting with an Asus device."""
 from __future__ import annotations
 
 import asyncio
+import copy
 import json
 import logging
+import random
+from collections import deque
 from datetime import datetime, timedelta, timezone
-from typing import Any, Awaitable, Callable, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional
+from urllib.parse import quote
 
 import aiohttp
 
 from asusrouter.connection import Connection
 from asusrouter.const import (
     DEFAULT_CACHE_TIME,
+    DEFAULT_CHANGES_SIZE,
+    DEFAULT_ONLINE_INTERVAL,
+    DEFAULT_ONLINE_MAX_INTERVAL,
+    DEFAULT_ONLINE_TIMEOUT,
+    DEFAULT_PING_CONCURRENCY,
+    DEFAULT_PING_COUNT,
     DEFAULT_RESULT_SUCCESS,
+    DEFAULT_SPEEDTEST_INTERVAL,
+    DEFAULT_SPEEDTEST_MAX_INTERVAL,
+    DEFAULT_SPEEDTEST_TIMEOUT,
     DEFAULT_TIMEOUT,
     RequestType,
 )
@@ -24,11 +37,15 @@ from asusrouter.error import (
     AsusRouterAccessError,
     AsusRouterConnectionError,
     AsusRouterDataError,
+    AsusRouterServiceError,
+    AsusRouterTimeoutError,
 )
 from asusrouter.modules.attributes import AsusRouterAttribute
-from asusrouter.modules.data import AsusData, AsusDataState
+from asusrouter.modules.data import AsusData, AsusDataLazy, AsusDataState
 from asusrouter.modules.data_finder import (
+    ASUSDATA_AIMESH_ALL,
     ASUSDATA_ENDPOINT_APPEND,
+    ASUSDATA_HISTORIC,
     ASUSDATA_MAP,
     ASUSDATA_NVRAM,
     AsusDataFinder,
@@ -48,15 +65,19 @@ from asusrouter.modules.endpoint import (
     ENDPOINT_FORCE_REQUEST,
     Endpoint,
     EndpointControl,
+    EndpointTools,
     EndpointType,
     process,
     read,
 )
 from asusrouter.modules.endpoint.error import AccessError
-from asusrouter.modules.firmware import Firmware
+from asusrouter.modules.endpoint.network import process_ping
+from asusrouter.modules.firmware import FIRMWARE_388
 from asusrouter.modules.flags import Flag
 from asusrouter.modules.identity import AsusDevice, collect_identity
 from asusrouter.modules.port_forwarding import PortForwardingRule
+from asusrouter.modules.presence import PresenceLog
+from asusrouter.modules.rates import RateMode, RateSmoother
 from asusrouter.modules.service import async_call_service
 from asusrouter.modules.state import (
     AsusState,
@@ -66,9 +87,18 @@ from asusrouter.modules.state import (
     save_state,
     set_state,
 )
+from asusrouter.modules.subscription import (
+    DataChanges,
+    DataDiff,
+    Subscription,
+    diff_data,
+    merge_diffs,
+)
+from asusrouter.modules.timeseries import TimeSeriesStore
+from asusrouter.modules.topology import AiMeshTopology
 from asusrouter.tools import legacy
 from asusrouter.tools.converters import get_enum_key_by_value, safe_list
-from asusrouter.tools.readers import merge_dicts
+from asusrouter.tools.readers import merge_dicts_inplace
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -86,8 +116,21 @@ class AsusRouter:
         cache_time: Optional[float] = None,
         session: Optional[aiohttp.ClientSession] = None,
         dumpback: Optional[Callable[..., Awaitable[None]]] = None,
+        skip_unchanged: bool = False,
+        history_size: Optional[int] = None,
+        rate_smoothing: RateMode = RateMode.RAW,
     ):  # pylint: disable=too-many-arguments
-        """Initialize the interface."""
+        """Initialize the interface.
+
+        With `skip_unchanged`, a response identical to the previous one
+        for the same endpoint and request is not parsed again. The data
+        from the last time is kept and only its timestamp is refreshed.
+
+        With `history_size`, the last `history_size` values of the CPU,
+        RAM, network, temperature and client metrics are kept in memory.
+
+        `rate_smoothing` selects how the network speed and CPU usage
+        are smoothed between the updates."""
 
         _LOGGER.debug("Initializing a new interface to `%s`", hostname)
 
@@ -100,6 +143,36 @@ class AsusRouter:
         # Set the device identity
         self._identity: Optional[AsusDevice] = None
         self._state: dict[AsusData, AsusDataState] = {}
+        # Data received but not processed until requested
+        self._lazy: dict[AsusData, AsusDataLazy] = {}
+        # AiMesh network tree built from the nodes and clients data
+        self._topology = AiMeshTopology()
+        # Clients joining, leaving and roaming
+        self._presence = PresenceLog()
+        # Subscriptions to the data changes and the last values notified
+        self._subscriptions: dict[AsusData, list[Subscription]] = {}
+        self._snapshots: dict[AsusData, Any] = {}
+        self._callbacks: set[asyncio.Future] = set()
+        # Recent changes of the tracked data with their versions
+        self._changes: dict[AsusData, deque[tuple[int, DataDiff]]] = {}
+        # History of the numeric metrics
+        self._history: Optional[TimeSeriesStore] = (
+            TimeSeriesStore(history_size) if history_size else None
+        )
+        # Smoothing of the rates calculated from the counters
+        self._smoothers: dict[AsusData, RateSmoother] = {
+            AsusData.CPU: RateSmoother(rate_smoothing),
+            AsusData.NETWORK: RateSmoother(rate_smoothing),
+        }
+
+        # Digests of the last processed content and the data it produced
+        self._skip_unchanged = skip_unchanged
+        self._digests: dict[
+            tuple[EndpointType, str],
+            tuple[tuple[int, int], Optional[tuple[AsusData, ...]]],
+        ] = {}
+        # Number of parsed and skipped responses per endpoint
+        self._parse_stats: dict[EndpointType, dict[str, int]] = {}
 
         # Set the flags
         self._flags: Flag = Flag()
@@ -108,6 +181,9 @@ class AsusRouter:
         # ID from the last called service
         self._last_id: Optional[int] = None
 
+        # Set while the device is known to answer
+        self._online = asyncio.Event()
+
         # Create an empty connection and save the credentials
         self._connection: Optional[Connection] = None
         self._username = username
@@ -173,7 +249,11 @@ class AsusRouter:
             raise ex
 
         # Get the device identity
-        return await self.async_get_identity() is not None
+        if await self.async_get_identity() is None:
+            return False
+
+        self._online.set()
+        return True
 
     async def async_disconnect(self) -> bool:
         """Disconnect from the device."""
@@ -195,9 +275,76 @@ class AsusRouter:
 
         _LOGGER.debug("Triggered method _async_drop_connection")
 
+        self._online.clear()
         if self._connection:
             self._connection.reset_connection()
 
+    async def async_wait_online(
+        self,
+        deadline: Optional[datetime] = None,
+        interval: float = DEFAULT_ONLINE_INTERVAL,
+        max_interval: float = DEFAULT_ONLINE_MAX_INTERVAL,
+        force_identity: bool = False,
+    ) -> bool:
+        """Wait for the device to answer again, e.g. after a reboot.
+
+        The device is probed with an interval doubling up to `max_interval`,
+        randomized so that several clients don't probe at the same time.
+        Once it answers, the connection is restored and the `online` event
+        is set. The cached identity is kept unless `force_identity` (e.g.
+        after a firmware upgrade). Returns False if the device is not back
+        by the `deadline` (DEFAULT_ONLINE_TIMEOUT from now by default).
+        A naive `deadline` is taken as local time."""
+
+        _LOGGER.debug("Triggered method async_wait_online")
+
+        if deadline is None:
+            deadline = datetime.now(timezone.utc) + timedelta(
+                seconds=DEFAULT_ONLINE_TIMEOUT
+            )
+        else:
+            deadline = deadline.astimezone(timezone.utc)
+
+        # The device may not answer yet, so the new connection
+        # is not logged in right away
+        if self._connection is None:
+            self._connection = Connection(
+                hostname=self._hostname,
+                username=self._username,
+                password=self._password,
+                port=self._port,
+                use_ssl=self._use_ssl,
+                session=self._session,
+                timeout=DEFAULT_TIMEOUT,
+                dumpback=self._dumpback,
+            )
+        connection = self._connection
+
+        wait = interval
+        while True:
+            if await connection.async_probe():
+                # The web server can answer before it accepts the login
+                connection.reset_connection()
+                try:
+                    if await connection.async_connect():
+                        # The content after a restart differs from the last one
+                        self._digests.clear()
+                        self._lazy.clear()
+                        await self.async_get_identity(force=force_identity)
+                        break
+                except Exception as ex:  # pylint: disable=broad-except
+                    _LOGGER.debug("Device answers, but is not ready: %s", ex)
+
+            remaining = (deadline - datetime.now(timezone.utc)).total_seconds()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(random.uniform(wait / 2, wait), remaining))
+            wait = min(wait * 2, max_interval)
+
+        self._online.set()
+        _LOGGER.debug("Device %s is online", self._hostname)
+        return True
+
     async def _async_handle_exception(self, ex: Exception) -> None:
         """Handle exceptions."""
 
@@ -270,7 +417,7 @@ class AsusRouter:
         if self._identity:
             firmware = self._identity.firmware
             merlin = self._identity.merlin
-            fw_388 = Firmware(major="3.0.0.4", minor=388, build=0)
+            fw_388 = FIRMWARE_388
             # Stock
             if not merlin:
                 _LOGGER.debug("Adding conditional rules for stock firmware")
@@ -378,16 +525,18 @@ class AsusRouter:
         """A wrapper for the connection query method."""
 
         if endpoint in ASUSDATA_ENDPOINT_APPEND:
-            payload = payload or ""
+            parts = [payload] if payload else []
             for key, attribute in ASUSDATA_ENDPOINT_APPEND[endpoint].items():
+                # Keep the value set in the request itself
+                if payload and f"{key}=" in payload:
+                    continue
                 if isinstance(attribute, AsusRouterAttribute):
                     value = self._get_attribute(attribute)
                 else:
                     value = attribute
                 if value:
-                    payload += f"{key}={value};"
-            # Remove trailing semicolon
-            payload = payload[:-1]
+                    parts.append(f"{key}={value}")
+            payload = ";".join(parts)
 
         _LOGGER.debug(
             "Triggered method async_api_query: %s | %s", endpoint, payload
@@ -399,13 +548,63 @@ class AsusRouter:
             endpoint, payload, request_type=request_type
         )
 
+    def _check_digest(
+        self, endpoint: EndpointType, request: str, content: str
+    ) -> bool:
+        """Check whether the content is the same as the last processed one.
+
+        The new digest is saved without the data keys, so that it
+        can only be reused after the content is processed again."""
+
+        key = (endpoint, request)
+        digest = (len(content), hash(content))
+
+        last = self._digests.get(key)
+        if last and last[0] == digest and last[1] is not None:
+            return True
+
+        self._digests[key] = (digest, None)
+        return False
+
+    def _save_digest(
+        self,
+        endpoint: EndpointType,
+        request: str,
+        datatypes: tuple[AsusData, ...],
+    ) -> None:
+        """Save the data produced by the last processed content."""
+
+        key = (endpoint, request)
+        last = self._digests.get(key)
+        if not last:
+            return
+
+        # Data calculated from the previous state cannot be reused
+        if any(datatype in ASUSDATA_HISTORIC for datatype in datatypes):
+            self._digests.pop(key, None)
+            return
+
+        self._digests[key] = (last[0], datatypes)
+
+    def _count_parse(self, endpoint: EndpointType, stat: str) -> None:
+        """Count a parsed or skipped response."""
+
+        stats = self._parse_stats.setdefault(
+            endpoint, {"parsed": 0, "skipped": 0}
+        )
+        stats[stat] += 1
+
     async def async_api_load(
         self,
         endpoint: EndpointType,
         request: str = "",
         retry: int = 0,
-    ) -> dict[str, Any]:
-        """Load API endpoint with optional request."""
+        skip_unchanged: bool = False,
+    ) -> Optional[dict[str, Any]]:
+        """Load API endpoint with optional request.
+
+        With `skip_unchanged`, None is returned when the content is the same
+        as the last processed one for this endpoint and request."""
 
         _LOGGER.debug("Triggered method async_api_load: %s", endpoint)
 
@@ -424,12 +623,21 @@ class AsusRouter:
                 # Wait before repeating the request
                 await asyncio.sleep(1 + retry * 3)
                 # Repeat request once more and see what happens
-                return await self.async_api_load(endpoint, request, True)
+                return await self.async_api_load(
+                    endpoint, request, True, skip_unchanged
+                )
             # Otherwise just raise the exception
             raise ex
 
         # Log status
         _LOGGER.debug("Response %s received from %s", status, endpoint)
+        self._online.set()
+
+        # Skip reading the content if it has not changed
+        if skip_unchanged and self._check_digest(endpoint, request, content):
+            _LOGGER.debug("Content from %s has not changed", endpoint)
+            self._count_parse(endpoint, "skipped")
+            return None
 
         # Try to read the content
         try:
@@ -441,11 +649,15 @@ class AsusRouter:
             # Just repeat request once more and see what happens
             # Only if we haven't tried already
             if not retry:
-                return await self.async_api_load(endpoint, request, True)
+                return await self.async_api_load(
+                    endpoint, request, True, skip_unchanged
+                )
             raise AsusRouterDataError(
                 "Something went wrong while reading the content"
             ) from ex
 
+        self._count_parse(endpoint, "parsed")
+
         # Check if we need to drop the connection
         run_service = result.get("run_service", None)
         if run_service in ("restart_httpd", "reboot"):
@@ -474,6 +686,11 @@ class AsusRouter:
             "Triggered method async_api_command: %s | %s", endpoint, commands
         )
 
+        # Any command can change the data, so the content digests
+        # and the postponed data cannot be trusted anymore
+        self._digests.clear()
+        self._lazy.clear()
+
         return await self.async_api_load(
             endpoint=endpoint,
             request=str(commands),
@@ -538,15 +755,20 @@ class AsusRouter:
 
         if datatype == AsusData.CPU:
             _LOGGER.debug("Transforming CPU data")
-            return transform_cpu(data)
+            return self._smoothers[AsusData.CPU].smooth_fields(
+                transform_cpu(data), ("usage",)
+            )
 
         if datatype == AsusData.NETWORK:
             _LOGGER.debug("Transforming network data")
-            return transform_network(
-                data,
-                self._identity.services if self._identity else [],
-                self._state.get(AsusData.NETWORK),
-                model=self._identity.model if self._identity else None,
+            return self._smoothers[AsusData.NETWORK].smooth_fields(
+                transform_network(
+                    data,
+                    self._identity.services if self._identity else [],
+                    self._state.get(AsusData.NETWORK),
+                    model=self._identity.model if self._identity else None,
+                ),
+                ("rx_speed", "tx_speed"),
             )
 
         if datatype == AsusData.PORTS:
@@ -628,6 +850,48 @@ class AsusRouter:
                 )
             )
 
+    def _process_lazy(self, datatype: AsusData) -> None:
+        """Process the data postponed by an earlier request if still valid."""
+
+        lazy = self._lazy.pop(datatype, None)
+        if lazy is None:
+            return
+
+        # Data older than the cache time will be fetched again
+        if datetime.now(timezone.utc) - lazy.timestamp >= timedelta(
+            seconds=self._cache_time
+        ):
+            return
+
+        _LOGGER.debug("Processing postponed data for `%s`", datatype)
+
+        value = self._transform_data(datatype, lazy.get(datatype))
+        if datatype not in self._state:
+            self._state[datatype] = AsusDataState()
+        self._state[datatype].update(value)
+        # Keep the time the data was received
+        self._state[datatype].timestamp = lazy.timestamp
+        self._on_state_update(datatype)
+
+    def _on_state_update(self, datatype: AsusData) -> None:
+        """Update everything built on top of the state data."""
+
+        self._notify(datatype)
+
+        state = self._state[datatype]
+        data = state.data
+        if not isinstance(data, dict):
+            return
+
+        if self._history is not None:
+            self._history.feed(datatype, data, state.timestamp)
+
+        if datatype == AsusData.AIMESH:
+            self._topology.update_nodes(data)
+        elif datatype == AsusData.CLIENTS:
+            self._topology.update_clients(data)
+            self._presence.update(data, state.timestamp)
+
     def _return_state(self, datatype: AsusData, **kwargs: Any) -> Any:
         """Return a proper state."""
 
@@ -657,6 +921,33 @@ class AsusRouter:
 
         return state
 
+    def _save_data(self, result: dict[AsusData, Any]) -> None:
+        """Save the processed data to the state."""
+
+        for key, value in result.items():
+            # Transform data if needed
+            value = self._transform_data(key, value)
+            # Save the data
+            result[key] = value
+            # Update the state
+            if key not in self._state:
+                self._state[key] = AsusDataState()
+            self._state[key].update(value)
+            # Drop the postponed data, it is outdated now
+            self._lazy.pop(key, None)
+            self._on_state_update(key)
+
+    def _is_fresh(self, datatype: AsusData) -> bool:
+        """Check whether the data is younger than the cache time."""
+
+        state = self._state.get(datatype)
+        return bool(
+            state
+            and state.data
+            and datetime.now(timezone.utc) - state.timestamp
+            < timedelta(seconds=self._cache_time)
+        )
+
     async def async_get_data(
         self, datatype: AsusData, force: bool = False, **kwargs: Any
     ) -> Any:
@@ -680,12 +971,14 @@ class AsusRouter:
                     "Timeout while waiting for data. Will try fetching again"
                 )
 
+        # Process the data received with an earlier request
+        if not force:
+            self._process_lazy(datatype)
+
         # Check if we have the data already and not forcing a refresh
         if self._state[datatype].data and not force:
             # Check if the data is younger than the cache time
-            if datetime.now(timezone.utc) - self._state[
-                datatype
-            ].timestamp < timedelta(seconds=self._cache_time):
+            if self._is_fresh(datatype):
                 _LOGGER.debug(
                     "Using cached data for `%s`: %s",
                     datatype,
@@ -710,8 +1003,17 @@ class AsusRouter:
             return {}
 
         # The data we are looking for
-        data = {}
+        data: Optional[dict[str, Any]] = {}
         result: dict[AsusData, Any] = {}
+        # Data kept from the last time, since the content has not changed
+        reused: set[AsusData] = set()
+
+        # Unchanged content can be skipped only if it is not merged
+        # with the content of other endpoints
+        skip_unchanged = self._skip_unchanged and (
+            len(data_finder.endpoint) == 1
+            or data_finder.merge == AsusDataMerge.ANY
+        )
 
         try:
             for endpoint in data_finder.endpoint:
@@ -738,7 +1040,25 @@ class AsusRouter:
                     request = request[:-1]
 
                 # Fetch the data
-                data = await self.async_api_load(endpoint, request)
+                data = await self.async_api_load(
+                    endpoint, request, skip_unchanged=skip_unchanged
+                )
+
+                # The content has not changed, keep the data from last time
+                if data is None:
+                    kept = False
+                    for key in self._digests[(endpoint, request)][1] or ():
+                        if key in self._lazy:
+                            self._lazy[key].timestamp = datetime.now(
+                                timezone.utc
+                            )
+                            kept = True
+                        elif key in self._state:
+                            reused.add(key)
+                            kept = True
+                    if kept and data_finder.merge == AsusDataMerge.ANY:
+                        break
+                    continue
 
                 # Make sure, identity is available
                 if not self._identity:
@@ -750,6 +1070,7 @@ class AsusRouter:
                     self._state,
                     self._identity.firmware,
                     self._identity.wlan,
+                    {datatype},
                 )
 
                 # Check whether data should be dropped
@@ -760,22 +1081,30 @@ class AsusRouter:
                 for key in to_drop:
                     processed.pop(key, None)
 
-                result = merge_dicts(result, processed)
+                if skip_unchanged:
+                    self._save_digest(endpoint, request, tuple(processed))
+
+                # Keep the data not requested aside
+                for key, value in list(processed.items()):
+                    if isinstance(value, AsusDataLazy):
+                        self._lazy[key] = processed.pop(key)
+
+                merge_dicts_inplace(result, processed)
 
                 # Check if we have data and data finder merge is ANY
                 if result and data_finder.merge == AsusDataMerge.ANY:
                     break
 
+            # Refresh the timestamp of the data kept from the last time
+            for key in reused - result.keys():
+                self._state[key].update(self._state[key].data)
+                self._on_state_update(key)
+
             # Save the data state
-            for key, value in result.items():
-                # Transform data if needed
-                value = self._transform_data(key, value)
-                # Save the data
-                result[key] = value
-                # Update the state
-                if key not in self._state:
-                    self._state[key] = AsusDataState()
-                self._state[key].update(value)
+            self._save_data(result)
+
+            # The requested data might have been postponed earlier
+            self._process_lazy(datatype)
         except (AsusRouterConnectionError, AsusRouterDataError):
             return self._return_state(datatype, **kwargs)
 
@@ -793,6 +1122,372 @@ class AsusRouter:
         )
         return self._return_state(datatype, **kwargs)
 
+    def _hook_request(self, datatype: AsusData) -> Optional[str]:
+        """Get the hook request for the data available only from the hook."""
+
+        data_finder = self._where_to_get_data(datatype)
+        if not data_finder or data_finder.endpoint != [Endpoint.HOOK]:
+            return None
+
+        request = "".join(
+            f"{key}({value});" for key, value in data_finder.request
+        )
+        if data_finder.method:
+            argument = self._get_attribute(data_finder.arguments)
+            request += (
+                data_finder.method(argument)
+                if argument
+                else data_finder.method()
+            )
+        return request
+
+    async def _async_get_hook_data(
+        self, requests: dict[AsusData, str]
+    ) -> set[AsusData]:
+        """Get the data for several datatypes with a single hook request.
+
+        Returns the datatypes received."""
+
+        # The same parts (e.g. nvram values) are requested only once
+        parts = dict.fromkeys(
+            part
+            for request in requests.values()
+            for part in request.split(";")
+            if part
+        )
+        request = ";".join(parts)
+
+        for datatype in requests:
+            self._state[datatype].start()
+
+        try:
+            data = await self.async_api_load(Endpoint.HOOK, f"hook={request}")
+            if data:
+                if not self._identity:
+                    self._identity = await self.async_get_identity()
+
+                processed = process(
+                    Endpoint.HOOK,
+                    data,
+                    self._state,
+                    self._identity.firmware,
+                    self._identity.wlan,
+                    set(requests),
+                )
+                for key in list(processed):
+                    if self._drop_data(key, Endpoint.HOOK):
+                        processed.pop(key)
+                    elif isinstance(processed[key], AsusDataLazy):
+                        self._lazy[key] = processed.pop(key)
+
+                self._save_data(processed)
+                return set(requests) & processed.keys()
+        except (AsusRouterConnectionError, AsusRouterDataError) as ex:
+            # Each datatype will be requested on its own
+            _LOGGER.debug("Combined hook request failed: %s", ex)
+        finally:
+            for datatype in requests:
+                self._state[datatype].stop()
+
+        return set()
+
+    async def async_get_data_many(
+        self, datatypes: Iterable[AsusData], force: bool = False
+    ) -> dict[AsusData, Any]:
+        """Get several datatypes at once.
+
+        The datatypes available from the hook endpoint are fetched with
+        a single combined request, the rest concurrently."""
+
+        datatypes = list(dict.fromkeys(datatypes))
+
+        if not self._identity:
+            self._identity = await self.async_get_identity()
+
+        hooks: dict[AsusData, str] = {}
+        for datatype in datatypes:
+            self._check_state(datatype)
+            if self._state[datatype].active:
+                continue
+            if not force:
+                self._process_lazy(datatype)
+                if self._is_fresh(datatype):
+                    continue
+            request = self._hook_request(datatype)
+            if request:
+                hooks[datatype] = request
+
+        # Datatypes sharing the same request are fetched together anyway
+        fetched: set[AsusData] = set()
+        if len(set(hooks.values())) > 1:
+            fetched = await self._async_get_hook_data(hooks)
+            await self._check_flags()
+
+        values = await asyncio.gather(
+            *(
+                self.async_get_data(
+                    datatype, force=force and datatype not in fetched
+                )
+                for datatype in datatypes
+            )
+        )
+        return dict(zip(datatypes, values))
+
+    def data_timestamp(self, datatype: AsusData) -> Optional[datetime]:
+        """Get the time the data was last received from the device."""
+
+        state = self._state.get(datatype)
+        if state is None or state.data is None:
+            return None
+        return state.timestamp
+
+    # ---------------------------
+    # AiMesh-related methods -->
+    # ---------------------------
+
+    async def _async_get_mesh_data(
+        self, datatypes: list[AsusData], force: bool = False
+    ) -> dict[AsusData, Any]:
+        """Get the data received for the whole AiMesh network.
+
+        The datatypes share the same request, so they are fetched one
+        after another and the ones filled by an earlier request in this
+        call are taken from the state."""
+
+        started = datetime.now(timezone.utc)
+        result: dict[AsusData, Any] = {}
+        for datatype in datatypes:
+            timestamp = self.data_timestamp(datatype)
+            refreshed = timestamp is not None and timestamp >= started
+            result[datatype] = await self.async_get_data(
+                datatype, force=force and not refreshed, device="all"
+            )
+        return result
+
+    async def async_get_aimesh_data(
+        self,
+        datatypes: Optional[list[AsusData]] = None,
+        force: bool = False,
+    ) -> dict[str, dict[AsusData, Any]]:
+        """Get data for every AiMesh node.
+
+        Node data is received for the whole network with a single request
+        and split by node. The result is keyed by the node MAC address
+        and always includes the node itself as `AsusData.AIMESH`. Clients
+        are grouped by the node they are connected to."""
+
+        if datatypes is None:
+            datatypes = [*ASUSDATA_AIMESH_ALL, AsusData.CLIENTS]
+
+        nodes = await self.async_get_data(AsusData.AIMESH, force=force)
+        if not isinstance(nodes, dict):
+            return {}
+
+        snapshot: dict[str, dict[AsusData, Any]] = {
+            mac: {AsusData.AIMESH: node} for mac, node in nodes.items()
+        }
+
+        mesh = [
+            datatype
+            for datatype in datatypes
+            if datatype in ASUSDATA_AIMESH_ALL
+        ]
+        with_clients = AsusData.CLIENTS in datatypes
+
+        # Clients come from another endpoint and are fetched meanwhile
+        mesh_data, clients = await asyncio.gather(
+            self._async_get_mesh_data(mesh, force=force),
+            (
+                self.async_get_data(AsusData.CLIENTS, force=force)
+                if with_clients
+                else asyncio.sleep(0)
+            ),
+        )
+
+        for datatype, value in mesh_data.items():
+            # Node data is keyed by the node MAC address
+            for mac in snapshot:
+                snapshot[mac][datatype] = (
+                    value.get(mac, {}) if isinstance(value, dict) else {}
+                )
+
+        if with_clients:
+            for mac in snapshot:
+                snapshot[mac][AsusData.CLIENTS] = {}
+            for mac, client in (clients or {}).items():
+                node = getattr(client.connection, "node", None)
+                if node in snapshot:
+                    snapshot[node][AsusData.CLIENTS][mac] = client
+
+        return snapshot
+
+    # ---------------------------
+    # <-- AiMesh-related methods
+    # ---------------------------
+
+    # ---------------------------
+    # Metrics-related methods -->
+    # ---------------------------
+
+    def top_clients(
+        self, count: int = 10, window: Optional[float] = None
+    ) -> list[tuple[str, float]]:
+        """Get the clients with the highest throughput.
+
+        The throughput is the sum of the average RX and TX speeds over
+        the last `window` seconds. Requires the history to be enabled."""
+
+        if self._history is None:
+            return []
+
+        return self._history.top(
+            "clients.", ("rx_speed", "tx_speed"), count, window
+        )
+
+    # ---------------------------
+    # <-- Metrics-related methods
+    # ---------------------------
+
+    # ---------------------------
+    # Subscription-related methods -->
+    # ---------------------------
+
+    def subscribe(
+        self,
+        datatype: AsusData,
+        callback: Callable[[AsusData, DataDiff], Any],
+        keys: Optional[Iterable[Any]] = None,
+    ) -> Callable[[], None]:
+        """Subscribe to the changes of the data.
+
+        The callback is called with the datatype and the difference
+        from the previous value each time the data changes. With `keys`,
+        only the changes of these keys are reported. A coroutine returned
+        by the callback is scheduled as a task.
+
+        Returns the method to unsubscribe."""
+
+        subscription = Subscription(
+            datatype, callback, set(keys) if keys is not None else None
+        )
+        self._subscriptions.setdefault(datatype, []).append(subscription)
+
+        # The current value is the base for the first difference
+        if datatype not in self._snapshots and datatype in self._state:
+            self._snapshots[datatype] = copy.deepcopy(
+                self._state[datatype].data
+            )
+
+        def _unsubscribe() -> None:
+            """Remove the subscription."""
+
+            subscriptions = [
+                item
+                for item in self._subscriptions.get(datatype, [])
+                if item is not subscription
+            ]
+            if subscriptions:
+                self._subscriptions[datatype] = subscriptions
+                return
+            self._subscriptions.pop(datatype, None)
+            if datatype not in self._changes:
+                self._snapshots.pop(datatype, None)
+
+        return _unsubscribe
+
+    def _notify(self, datatype: AsusData) -> None:
+        """Notify the subscribers if the data has changed.
+
+        The difference is calculated once for all the subscribers
+        and saved to the changes log if tracked."""
+
+        subscriptions = self._subscriptions.get(datatype, [])
+        changes = self._changes.get(datatype)
+        if not subscriptions and changes is None:
+            return
+
+        state = self._state[datatype]
+        diff = diff_data(self._snapshots.get(datatype), state.data)
+        if not diff:
+            return
+
+        # The data can be changed in place later, so keep a copy
+        self._snapshots[datatype] = copy.deepcopy(state.data)
+
+        state.version += 1
+        if changes is not None:
+            changes.append((state.version, diff))
+
+        changed = diff.keys()
+        for subscription in subscriptions:
+            if subscription.keys is None:
+                selected = diff
+            elif subscription.keys & changed:
+                selected = diff.select(subscription.keys)
+            else:
+                continue
+
+            try:
+                result = subscription.callback(datatype, selected)
+                if asyncio.iscoroutine(result):
+                    task = asyncio.ensure_future(result)
+                    self._callbacks.add(task)
+                    task.add_done_callback(self._callbacks.discard)
+            except Exception as ex:  # pylint: disable=broad-except
+                _LOGGER.warning(
+                    "Callback for `%s` changes failed: %s", datatype, ex
+                )
+
+    async def async_get_changes(
+        self,
+        datatype: AsusData,
+        since_version: Optional[int] = None,
+        force: bool = False,
+    ) -> DataChanges:
+        """Get the data changes since the version.
+
+        The first call starts tracking the changes of the data and
+        returns the full value with its version. Next calls with this
+        version return only the changes, or `modified=False` if the data
+        is the same. Only the last changes are kept, so the full value is
+        returned for a version too old."""
+
+        if datatype not in self._changes:
+            self._changes[datatype] = deque(maxlen=DEFAULT_CHANGES_SIZE)
+            # The current value is the base for the first difference
+            if datatype not in self._snapshots and datatype in self._state:
+                self._snapshots[datatype] = copy.deepcopy(
+                    self._state[datatype].data
+                )
+
+        data = await self.async_get_data(datatype, force=force)
+        version = self._state[datatype].version
+
+        if since_version is None:
+            return DataChanges(version, data=data)
+        if since_version == version:
+            return DataChanges(version, modified=False)
+
+        changes = self._changes[datatype]
+        # The changes right after the version are not available
+        if (
+            since_version > version
+            or not changes
+            or changes[0][0] > since_version + 1
+        ):
+            return DataChanges(version, data=data)
+
+        return DataChanges(
+            version,
+            diff=merge_diffs(
+                diff for number, diff in changes if number > since_version
+            ),
+        )
+
+    # ---------------------------
+    # <-- Subscription-related methods
+    # ---------------------------
+
     # ---------------------------
     # Service-related methods -->
     # ---------------------------
@@ -918,6 +1613,7 @@ class AsusRouter:
                 save_state(
                     state, self._state, self._needed_time, self._last_id
                 )
+                self._on_state_update(_datatype)
                 # Reset the needed time and last id
                 self._needed_time = None
                 self._last_id = None
@@ -928,6 +1624,124 @@ class AsusRouter:
     # <-- Service-related methods
     # ---------------------------
 
+    # ---------------------------
+    # Speedtest-related methods -->
+    # ---------------------------
+
+    async def async_run_speedtest(
+        self,
+        deadline: Optional[datetime] = None,
+        interval: float = DEFAULT_SPEEDTEST_INTERVAL,
+        max_interval: float = DEFAULT_SPEEDTEST_MAX_INTERVAL,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Run the Ookla speedtest and yield its steps as they are reported.
+
+        The progress is checked every `interval` seconds, and less often
+        (up to `max_interval`) while nothing changes. The last step yielded
+        is the result (`type` is `result`), after which the iteration stops.
+        Raises AsusRouterTimeoutError if the test is not finished
+        by the `deadline` (DEFAULT_SPEEDTEST_TIMEOUT from now by default).
+        A naive `deadline` is taken as local time."""
+
+        if not self._identity:
+            self._identity = await self.async_get_identity()
+        if not self._identity.ookla:
+            raise AsusRouterServiceError("Speedtest is not supported")
+
+        if deadline is None:
+            deadline = datetime.now(timezone.utc) + timedelta(
+                seconds=DEFAULT_SPEEDTEST_TIMEOUT
+            )
+        else:
+            deadline = deadline.astimezone(timezone.utc)
+
+        # Steps of the previous test are kept until the new one starts
+        previous = await self.async_get_data(
+            AsusData.SPEEDTEST_RESULT, force=True
+        )
+
+        if not await self.async_run_service("ookla_speedtest", apply=True):
+            raise AsusRouterServiceError("Speedtest could not be started")
+
+        reported = 0
+        wait = interval
+        while True:
+            remaining = (deadline - datetime.now(timezone.utc)).total_seconds()
+            if remaining <= 0:
+                raise AsusRouterTimeoutError(
+                    "Speedtest is not finished in time"
+                )
+            await asyncio.sleep(min(wait, remaining))
+
+            steps = await self.async_get_data(
+                AsusData.SPEEDTEST_RESULT, force=True
+            )
+            if not isinstance(steps, list) or steps == previous:
+                wait = min(wait * 2, max_interval)
+                continue
+            # A new test has been started in the meantime
+            if len(steps) < reported:
+                reported = 0
+
+            new = [step for step in steps[reported:] if isinstance(step, dict)]
+            reported = len(steps)
+            # Check often while the test is progressing
+            wait = interval if new else min(wait * 2, max_interval)
+
+            for step in new:
+                yield step
+                if step.get("type") == "result":
+                    return
+
+    # ---------------------------
+    # <-- Speedtest-related methods
+    # ---------------------------
+
+    # ---------------------------
+    # Network tools-related methods -->
+    # ---------------------------
+
+    async def _async_ping(
+        self, host: str, count: int, semaphore: asyncio.Semaphore
+    ) -> dict[str, Optional[float]]:
+        """Ping a single host from the device."""
+
+        request = f"act=ping;dst_ip={quote(host, safe='')};ping_count={count}"
+        async with semaphore:
+            try:
+                data = await self.async_api_load(
+                    EndpointTools.NETWORK, request
+                )
+            except (AsusRouterConnectionError, AsusRouterDataError) as ex:
+                _LOGGER.debug("Failed to ping `%s`: %s", host, ex)
+                data = {}
+
+        return process_ping(data or {})
+
+    async def async_ping_many(
+        self,
+        hosts: Iterable[str],
+        count: int = DEFAULT_PING_COUNT,
+        concurrency: int = DEFAULT_PING_CONCURRENCY,
+    ) -> dict[str, dict[str, Optional[float]]]:
+        """Ping the hosts from the device.
+
+        The pings are sent over the same connection, with at most
+        `concurrency` of them running at once. The result is keyed by
+        the host and has the packet `loss` (%), the `avg` round trip time
+        and the `jitter` (ms), None if the host could not be checked."""
+
+        hosts = list(dict.fromkeys(hosts))
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        results = await asyncio.gather(
+            *(self._async_ping(host, count, semaphore) for host in hosts)
+        )
+        return dict(zip(hosts, results))
+
+    # ---------------------------
+    # <-- Network tools-related methods
+    # ---------------------------
+
     # ---------------------------
     # Legacy methods -->
     # ---------------------------
@@ -1033,6 +1847,39 @@ class AsusRouter:
 
         return self._connection.connected if self._connection else False
 
+    @property
+    def online(self) -> asyncio.Event:
+        """Return the event set while the device is known to answer."""
+
+        return self._online
+
+    @property
+    def history(self) -> Optional[TimeSeriesStore]:
+        """Return the metrics history if enabled."""
+
+        return self._history
+
+    @property
+    def presence(self) -> PresenceLog:
+        """Return the clients presence log."""
+
+        return self._presence
+
+    @property
+    def topology(self) -> AiMeshTopology:
+        """Return the AiMesh topology."""
+
+        return self._topology
+
+    @property
+    def parse_stats(self) -> dict[EndpointType, dict[str, int]]:
+        """Return the number of parsed and skipped responses per endpoint."""
+
+        return {
+            endpoint: stats.copy()
+            for endpoint, stats in self._parse_stats.items()
+        }
+
     # ---------------------------
     # <-- Properties
     # ---------------------------
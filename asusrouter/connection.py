@@ -14,7 +14,12 @@ from urllib.parse import quote
 
 import aiohttp
 
-from asusrouter.const import DEFAULT_TIMEOUT, USER_AGENT, RequestType
+from asusrouter.const import (
+    DEFAULT_PROBE_TIMEOUT,
+    DEFAULT_TIMEOUT,
+    USER_AGENT,
+    RequestType,
+)
 from asusrouter.error import (
     AsusRouter404Error,
     AsusRouterAccessError,
@@ -391,7 +396,7 @@ class Connection:  # pylint: disable=too-many-instance-attributes
 
         # Add get parameters if needed
         if request_type == RequestType.GET and payload:
-            payload.replace(";", "&")
+            payload = payload.replace(";", "&")
             url = f"{url}?{payload}"
 
         # Process the payload to be sent
@@ -426,6 +431,28 @@ class Connection:  # pylint: disable=too-many-instance-attributes
             # Return the response
             return (resp_status, resp_headers, resp_content)
 
+    async def async_probe(
+        self, timeout: float = DEFAULT_PROBE_TIMEOUT
+    ) -> bool:
+        """Check whether the device web server answers.
+
+        Any HTTP response counts, no authorization is needed."""
+
+        if self._session is None or self._session.closed:
+            self._session = self._new_session()
+
+        url = f"{self._http}://{self._hostname}:{self._port}/"
+        try:
+            async with self._session.get(
+                url,
+                allow_redirects=False,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ):
+                return True
+        except (aiohttp.ClientError, asyncio.TimeoutError) as ex:
+            _LOGGER.debug("No answer from %s: %s", self._hostname, ex)
+            return False
+
     def reset_connection(self) -> None:
         """Reset connection variables."""
 
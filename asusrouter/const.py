@@ -28,7 +28,17 @@ USER_AGENT = "asusrouter--DUTUtil-"
 
 # Library defaults
 DEFAULT_CACHE_TIME = 5.0
+DEFAULT_CHANGES_SIZE = 64
+DEFAULT_ONLINE_INTERVAL = 1.0
+DEFAULT_ONLINE_MAX_INTERVAL = 10.0
+DEFAULT_ONLINE_TIMEOUT = 300.0
+DEFAULT_PING_CONCURRENCY = 8
+DEFAULT_PING_COUNT = 4
+DEFAULT_PROBE_TIMEOUT = 3.0
 DEFAULT_SLEEP_TIME = 0.1
+DEFAULT_SPEEDTEST_INTERVAL = 1.0
+DEFAULT_SPEEDTEST_MAX_INTERVAL = 5.0
+DEFAULT_SPEEDTEST_TIMEOUT = 120.0
 DEFAULT_TIMEOUT = 15
 DEFAULT_TIMEOUT_CONNECTION = 180.0
 
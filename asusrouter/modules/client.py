@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 from asusrouter.modules.connection import (
     ConnectionState,
@@ -219,26 +219,48 @@ def process_client(
     return AsusClient(state=state, description=description, connection=connection)
 
 
-def process_data(data: dict[str, Any], mapping: dict[str, Any], obj: Any) -> Any:
-    """Process data based on a mapping and set attributes on an object."""
+CompiledClientMap = tuple[
+    tuple[str, tuple[tuple[str, tuple[Callable[..., Any], ...]], ...]], ...
+]
 
-    # Go through all keys in mapping
+
+def compile_client_map(mapping: dict[str, Any]) -> CompiledClientMap:
+    """Unpack the search keys and converters of a mapping once."""
+
+    compiled = []
     for key, value in mapping.items():
+        pairs = []
         for pair in value:
-            # Get the search key and converter(s)
             key_to_find, converters = safe_unpack_key(pair)
+            if isinstance(converters, list):
+                converters = tuple(converters)
+            else:
+                converters = (converters,) if converters else ()
+            pairs.append((key_to_find, converters))
+        compiled.append((key, tuple(pairs)))
+
+    return tuple(compiled)
+
+
+def process_data(
+    data: dict[str, Any], mapping: dict[str, Any] | CompiledClientMap, obj: Any
+) -> Any:
+    """Process data based on a mapping and set attributes on an object."""
+
+    if isinstance(mapping, dict):
+        mapping = compile_client_map(mapping)
+
+    # Go through all keys in mapping
+    for key, pairs in mapping:
+        for key_to_find, converters in pairs:
             # Get the value from the data
             item = data.get(key_to_find)
 
             # Process the value if it's an actual value
-            if item is not None and item != str():
-                # Apply converters one by one if there are multiple
-                if isinstance(converters, list):
-                    for converter in converters:
-                        item = converter(item)
-                # Apply single converter
-                elif converters:
-                    item = converters(item)
+            if item is not None and item != "":
+                # Apply converters one by one
+                for converter in converters:
+                    item = converter(item)
 
                 # Set the attribute on the object
                 setattr(obj, key, item)
@@ -249,16 +271,26 @@ def process_data(data: dict[str, Any], mapping: dict[str, Any], obj: Any) -> Any
     return obj
 
 
+# Maps with the search keys and converters unpacked
+_COMPILED_MAP_DESCRIPTION = compile_client_map(CLIENT_MAP_DESCRIPTION)
+_COMPILED_MAP_CONNECTION = compile_client_map(CLIENT_MAP_CONNECTION)
+_COMPILED_MAP_CONNECTION_WLAN = compile_client_map(CLIENT_MAP_CONNECTION_WLAN)
+
+
 def process_client_description(data: dict[str, Any]) -> AsusClientDescription:
     """Process client description data."""
 
-    return process_data(data, CLIENT_MAP_DESCRIPTION, AsusClientDescription())
+    return process_data(
+        data, _COMPILED_MAP_DESCRIPTION, AsusClientDescription()
+    )
 
 
 def process_client_connection(data: dict[str, Any]) -> AsusClientConnection:
     """Process client connection data."""
 
-    connection = process_data(data, CLIENT_MAP_CONNECTION, AsusClientConnection())
+    connection = process_data(
+        data, _COMPILED_MAP_CONNECTION, AsusClientConnection()
+    )
 
     if not connection.type in (ConnectionType.WIRED, ConnectionType.DISCONNECTED):
         connection = process_client_connection_wlan(data, connection)
@@ -272,7 +304,9 @@ def process_client_connection_wlan(
     """Process WLAN client connection data."""
 
     wlan_connection = AsusClientConnectionWlan(**base_connection.__dict__)
-    wlan_connection = process_data(data, CLIENT_MAP_CONNECTION_WLAN, wlan_connection)
+    wlan_connection = process_data(
+        data, _COMPILED_MAP_CONNECTION_WLAN, wlan_connection
+    )
 
     # Mark `guest` attribute if `guest_id` is non-zero
     wlan_connection.guest = (
@@ -6,7 +6,7 @@ import asyncio
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 from asusrouter.tools.converters import safe_bool
 
@@ -60,6 +60,9 @@ class AsusDataState:
     timestamp: datetime = datetime.now(timezone.utc)
     active: bool = False
     inactive_event: asyncio.Event = asyncio.Event()
+    # Increased each time the data changes. Only counted for the data
+    # with subscribers or tracked changes
+    version: int = 0
 
     def start(self) -> None:
         """Set to active."""
@@ -110,6 +113,25 @@ class AsusDataState:
         self.timestamp = datetime.now(timezone.utc) + timedelta(seconds=offset)
 
 
+class AsusDataLazy:
+    """Data to be processed only when accessed."""
+
+    def __init__(self, method: Callable[[], dict[AsusData, Any]]) -> None:
+        """Initialize the lazy data."""
+
+        self._method = method
+        self._data: Optional[dict[AsusData, Any]] = None
+        self.timestamp = datetime.now(timezone.utc)
+
+    def get(self, datatype: AsusData) -> Any:
+        """Process the data on the first access and return the datatype."""
+
+        if self._data is None:
+            self._data = self._method()
+
+        return self._data.get(datatype)
+
+
 def convert_state(state: Any):
     """Convert the state to a correct one."""
 
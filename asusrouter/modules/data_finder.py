@@ -179,6 +179,14 @@ ASUSDATA_ENDPOINT_APPEND = {
     }
 }
 
+# Data received for the whole AiMesh network with a single request
+# and keyed by the node MAC address
+ASUSDATA_AIMESH_ALL = (AsusData.NODE_INFO, AsusData.PORTS)
+
+# Data calculated from the difference with the previous state.
+# It cannot be reused even when the raw content has not changed
+ASUSDATA_HISTORIC = (AsusData.CPU, AsusData.NETWORK)
+
 
 # A map of endptoins to get data from
 ASUSDATA_MAP: dict[AsusData, AsusData | AsusDataFinder] = {
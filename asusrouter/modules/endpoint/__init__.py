@@ -123,8 +123,12 @@ def process(
     history: Optional[dict[AsusData, AsusDataState]] = None,
     firmware: Optional[Firmware] = None,
     wlan: Optional[list[Wlan]] = None,
+    datatypes: Optional[set[AsusData]] = None,
 ) -> dict[AsusData, Any]:
-    """Process the data from an endpoint."""
+    """Process the data from an endpoint.
+
+    If `datatypes` are provided, the endpoint may return the rest
+    of the data as `AsusDataLazy`."""
 
     _LOGGER.debug("Processing data from endpoint %s", endpoint)
 
@@ -145,6 +149,10 @@ def process(
         require_wlan = getattr(submodule, "REQUIRE_WLAN", False)
         if require_wlan:
             data_set(data, wlan=wlan)
+        # Check if the submodule can process only the requested data
+        require_datatypes = getattr(submodule, "REQUIRE_DATATYPES", False)
+        if require_datatypes:
+            data_set(data, datatypes=datatypes)
 
         # Process the data
         return submodule.process(data)
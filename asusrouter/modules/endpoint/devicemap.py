@@ -6,16 +6,14 @@ import logging
 import re
 from datetime import datetime, timedelta
 from typing import Any, Optional, Tuple
+from xml.parsers import expat
 
-import xmltodict
 from dateutil.parser import parse as dtparse
 
 from asusrouter.modules.data import AsusData, AsusDataState
 from asusrouter.modules.endpoint import data_get
 from asusrouter.modules.openvpn import AsusOVPNClient, AsusOVPNServer
-from asusrouter.tools.cleaners import clean_dict, clean_dict_key_prefix
 from asusrouter.tools.converters import safe_int
-from asusrouter.tools.readers import merge_dicts
 
 from .devicemap_const import DEVICEMAP_BY_INDEX, DEVICEMAP_BY_KEY, DEVICEMAP_CLEAR
 
@@ -24,123 +22,183 @@ _LOGGER = logging.getLogger(__name__)
 REQUIRE_HISTORY = True
 
 
-def read(content: str) -> dict[str, Any]:
-    """Read devicemap data."""
+def _compile_devicemap() -> tuple[
+    dict[str, tuple[tuple[str, tuple[str, ...]], ...]],
+    dict[str, tuple[tuple[str, str, str, Optional[str]], ...]],
+    dict[str, tuple[tuple[str, str], ...]],
+]:
+    """Compile the devicemap constants into lookup tables.
 
-    # Create a dict to store the data
-    devicemap: dict[str, Any] = {}
+    Returns:
+    - input group -> (output group, input values) to read by index
+    - input group -> (input value, output group, `value=` prefix,
+      symbol to clear) to read by key
+    - output group -> (input value, output key) in the output order"""
 
-    # Parse the XML data
-    try:
-        xml_content: dict[str, Any] = xmltodict.parse(content).get("devicemap", {})
-        if not xml_content:
-            _LOGGER.debug("Received empty devicemap XML")
-            return devicemap
-    except xmltodict.expat.ExpatError as ex:  # type: ignore
-        _LOGGER.debug("Received invalid devicemap XML: %s", ex)
-        return devicemap
+    by_index: dict[str, list[tuple[str, tuple[str, ...]]]] = {}
+    by_key: dict[str, list[tuple[str, str, str, Optional[str]]]] = {}
+    layout: dict[str, dict[str, str]] = {}
 
-    # Go through the data and fill the dict
+    def _output_key(output_group: str, input_value: str) -> str:
+        """Output key without the output group prefix."""
 
-    # Get values by index using read_devicemap_index method
-    devicemap = merge_dicts(devicemap, read_index(xml_content))
+        if input_value.startswith(f"{output_group}_"):
+            return input_value.replace(f"{output_group}_", "")
+        return input_value
 
-    # Get values by key using read_devicemap_key method
-    devicemap = merge_dicts(devicemap, read_key(xml_content))
+    for output_group, input_group, input_values in DEVICEMAP_BY_INDEX:
+        by_index.setdefault(input_group, []).append(
+            (output_group, tuple(input_values))
+        )
+        group = layout.setdefault(output_group, {})
+        for input_value in input_values:
+            group.setdefault(input_value, _output_key(output_group, input_value))
 
-    # Clear values from useless symbols
-    for output_group, clear_map in DEVICEMAP_CLEAR.items():
-        if output_group not in devicemap:
-            continue
-        for key, clear_value in clear_map.items():
-            # If the key is not in the devicemap, continue
-            if key not in devicemap[output_group]:
-                continue
-            devicemap[output_group][key] = devicemap[output_group][key].replace(
-                clear_value, ""
+    for output_group, input_group, input_values in DEVICEMAP_BY_KEY:
+        clear_map = DEVICEMAP_CLEAR.get(output_group, {})
+        by_key.setdefault(input_group, []).extend(
+            (
+                input_value,
+                output_group,
+                f"{input_value}=",
+                clear_map.get(input_value),
             )
+            for input_value in input_values
+        )
+        group = layout.setdefault(output_group, {})
+        for input_value in input_values:
+            group.setdefault(input_value, _output_key(output_group, input_value))
 
-    # Clean the devicemap values
-    devicemap = clean_dict(devicemap)
-
-    # Clean the devicemap values_dict from output_group prefix
-    for output_group, values_dict in devicemap.items():
-        devicemap[output_group] = clean_dict_key_prefix(values_dict, output_group)
-
-    # Return the devicemap
-    return devicemap
-
-
-def read_index(xml_content: dict[str, Any]) -> dict[str, Any]:
-    """Read devicemap by index.
+    return (
+        {key: tuple(value) for key, value in by_index.items()},
+        {key: tuple(value) for key, value in by_key.items()},
+        {key: tuple(value.items()) for key, value in layout.items()},
+    )
 
-    This method performs reading of the devicemap by index
-    to simplify the original read_devicemap method."""
 
-    # Create a dict to store the data
-    devicemap: dict[str, Any] = {}
+DEVICEMAP_INDEX_LOOKUP, DEVICEMAP_KEY_LOOKUP, DEVICEMAP_LAYOUT = (
+    _compile_devicemap()
+)
 
-    # Get values for which we only know their order (index)
-    for output_group, input_group, input_values in DEVICEMAP_BY_INDEX:
-        # Create an empty dictionary for the output group
-        devicemap[output_group] = {}
 
-        # Check that the input group is in the xml content
-        if input_group not in xml_content:
-            continue
+def read(content: str) -> dict[str, Any]:
+    """Read devicemap data.
+
+    The XML is read in a single pass: each top-level node is matched
+    against the precompiled lookup tables as soon as it is closed,
+    so no intermediate tree is built."""
+
+    # Values read by index / by key for each output group
+    index_values: dict[str, dict[str, Optional[str]]] = {}
+    key_values: dict[str, dict[str, Optional[str]]] = {}
+    # Number of nodes and the first value for each input group
+    counts: dict[str, int] = {}
+    first_values: dict[str, Optional[str]] = {}
+    # Values to be found by key for each input group
+    pending = {
+        input_group: list(values)
+        for input_group, values in DEVICEMAP_KEY_LOOKUP.items()
+    }
 
-        # Use dict comprehension to build output_group_data
-        output_group_data = {
-            input_value: xml_content[input_group][index]
-            for index, input_value in enumerate(input_values)
-            if index < len(xml_content[input_group])
-        }
+    # Path to the current node and the text of the current top-level node
+    path: list[str] = []
+    text: list[str] = []
+    nested: list[bool] = [False]
+    root: list[Optional[str]] = [None]
+
+    def _start(name: str, _attrs: Any) -> None:
+        if not path:
+            root[0] = name
+        elif len(path) == 1:
+            text.clear()
+            nested[0] = False
+        elif len(path) > 1:
+            nested[0] = True
+        path.append(name)
+
+    def _end(name: str) -> None:
+        path.pop()
+        # Only the direct children of the root node carry values
+        if len(path) != 1:
+            return
+
+        value = None if nested[0] else "".join(text).strip() or None
+
+        index = counts.get(name, 0)
+        counts[name] = index + 1
+        if index == 0:
+            first_values[name] = value
+
+        for output_group, input_values in DEVICEMAP_INDEX_LOOKUP.get(name, ()):
+            if index < len(input_values):
+                index_values.setdefault(output_group, {})[
+                    input_values[index]
+                ] = value
+
+        to_find = pending.get(name)
+        if not to_find or value is None:
+            return
+        left = []
+        for item in to_find:
+            input_value, output_group, prefix, clear = item
+            if input_value not in value:
+                left.append(item)
+                continue
+            found = value.replace(prefix, "")
+            if clear:
+                found = found.replace(clear, "")
+            key_values.setdefault(output_group, {})[input_value] = (
+                found or None
+            )
+        pending[name] = left
 
-        # Add the output group data to the devicemap
-        devicemap[output_group] = output_group_data
+    def _forbid_entities(*_args: Any, **_kwargs: Any) -> None:
+        raise ValueError("entities are disabled")
 
-    # Return the devicemap
-    return devicemap
+    parser = expat.ParserCreate("utf-8")
+    parser.buffer_text = True
+    parser.StartElementHandler = _start
+    parser.EndElementHandler = _end
+    parser.CharacterDataHandler = text.append
+    parser.EntityDeclHandler = _forbid_entities
 
+    # Parse the XML data
+    try:
+        parser.Parse(content.encode("utf-8"), True)
+    except (expat.ExpatError, ValueError) as ex:
+        _LOGGER.debug("Received invalid devicemap XML: %s", ex)
+        return {}
 
-def read_key(xml_content: dict[str, Any]) -> dict[str, Any]:
-    """Read devicemap by key.
+    if root[0] != "devicemap" or not counts:
+        _LOGGER.debug("Received empty devicemap XML")
+        return {}
 
-    This method performs reading of the devicemap by key
-    to simplify the original read_devicemap method."""
+    # A single node is a string, which is read by index symbol by symbol
+    for input_group, values in DEVICEMAP_INDEX_LOOKUP.items():
+        if counts.get(input_group) != 1:
+            continue
+        value = first_values[input_group] or ""
+        for output_group, input_values in values:
+            index_values[output_group] = {
+                input_value: value[index]
+                for index, input_value in enumerate(input_values)
+                if index < len(value)
+            }
 
-    # Create a dict to store the data
+    # Combine the output in the correct order
     devicemap: dict[str, Any] = {}
-
-    # Get values for which we know their key
-    for output_group, input_group, input_values in DEVICEMAP_BY_KEY:
-        # Create a dict to store the data
-        output_group_data: dict[str, Any] = {}
-
-        # Go through the input values and fill the dict
-        for input_value in input_values:
-            # Get the input group data
-            xml_input_group = xml_content.get(input_group)
-
-            # If the input group data is None, skip this iteration
-            if xml_input_group is None:
-                continue
-
-            # If the input group data is a string, convert it to a list
-            if isinstance(xml_input_group, str):
-                xml_input_group = [xml_input_group]
-
-            # Go through the input group data and check if the input value is in it
-            for value in xml_input_group:
-                if input_value in value:
-                    # Add the input value to the output group data
-                    output_group_data[input_value] = value.replace(
-                        f"{input_value}=", ""
-                    )
-                    break
-
-        # Add the output group data to the devicemap
-        devicemap[output_group] = output_group_data
+    for output_group, layout in DEVICEMAP_LAYOUT.items():
+        by_index = index_values.get(output_group, {})
+        by_key = key_values.get(output_group, {})
+        group: dict[str, Any] = {}
+        for input_value, output_key in layout:
+            if by_index.get(input_value) is not None:
+                group[output_key] = by_index[input_value]
+            elif input_value in by_key:
+                group[output_key] = by_key[input_value]
+            elif input_value in by_index:
+                group[output_key] = None
+        devicemap[output_group] = group
 
     # Return the devicemap
     return devicemap
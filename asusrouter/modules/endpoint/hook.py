@@ -4,11 +4,12 @@ from __future__ import annotations
 
 import logging
 from datetime import datetime, timezone
-from typing import Any, Optional, Tuple
+from functools import partial
+from typing import Any, Callable, Optional, Tuple
 
 from asusrouter.modules.aura import process_aura
 from asusrouter.modules.connection import ConnectionState, ConnectionStatus
-from asusrouter.modules.data import AsusData, AsusDataState
+from asusrouter.modules.data import AsusData, AsusDataLazy, AsusDataState
 from asusrouter.modules.endpoint import data_get
 from asusrouter.modules.endpoint.error import AccessError
 from asusrouter.modules.led import AsusLED
@@ -25,43 +26,52 @@ from asusrouter.modules.port_forwarding import (
     AsusPortForwarding,
     PortForwardingRule,
 )
+from asusrouter.modules.rates import COUNTER_64, counter_delta
 from asusrouter.modules.vpnc import AsusVPNC, AsusVPNType
 from asusrouter.modules.wlan import MAP_GWLAN, MAP_WLAN, Wlan
 from asusrouter.tools.converters import (
-    run_method,
+    get_enum_key_by_value,
     safe_bool,
     safe_datetime,
     safe_int,
     safe_return,
-    safe_speed,
     safe_unpack_key,
-    safe_unpack_keys,
     safe_usage,
-    safe_usage_historic,
 )
-from asusrouter.tools.readers import merge_dicts
+from asusrouter.tools.readers import merge_dicts_inplace
 from asusrouter.tools.readers import read_json_content as read  # noqa: F401
 
 from .hook_const import (
+    COMPILED_OVPN_SERVER_388,
+    COMPILED_SPEEDTEST,
+    COMPILED_VPNC_WIREGUARD,
+    COMPILED_WAN,
+    COMPILED_WAN_ITEM,
+    COMPILED_WIREGUARD_CLIENT,
+    COMPILED_WIREGUARD_SERVER,
     MAP_NETWORK,
-    MAP_OVPN_SERVER_388,
-    MAP_SPEEDTEST,
-    MAP_VPNC_WIREGUARD,
-    MAP_WAN,
-    MAP_WAN_ITEM,
-    MAP_WAN_ITEM_X,
-    MAP_WIREGUARD_CLIENT,
-    MAP_WIREGUARD_SERVER,
 )
 
+REQUIRE_DATATYPES = True
 REQUIRE_HISTORY = True
 REQUIRE_WLAN = True
 
+# Both /proc/stat and /proc/net/dev counters are 64-bit,
+# so a decrease is a reset rather than a wrap
+CPU_COUNTER_SIZE = COUNTER_64
+NETDEV_COUNTER_SIZE = COUNTER_64
+# Highest plausible traffic of an interface, bytes per second (100 Gbit/s)
+NETDEV_MAX_RATE = 12.5e9
+
 _LOGGER = logging.getLogger(__name__)
 
 
 def process(data: dict[str, Any]) -> dict[AsusData, Any]:
-    """Process hook data."""
+    """Process hook data.
+
+    Only the requested datatypes are processed right away. The rest
+    of the available data is returned as `AsusDataLazy` to be processed
+    only when accessed."""
 
     # For this endpoint, the received data always depends on the sent request.
     # So, we need to check which data is available and process it accordingly.
@@ -72,106 +82,247 @@ def process(data: dict[str, Any]) -> dict[AsusData, Any]:
     # Get the passed awrguments
     history: dict[AsusData, AsusDataState] = data_get(data, "history") or {}
     wlan = data_get(data, "wlan") or []
+    datatypes: Optional[set[AsusData]] = data_get(data, "datatypes")
+
+    for markers, provides, method in HOOK_STATE:
+        # Check whether the data is available
+        if not any(marker in data for marker in markers):
+            continue
+
+        # Process the requested data
+        if datatypes is None or not datatypes.isdisjoint(provides):
+            state.update(method(data, history, wlan))
+            continue
+
+        # Postpone the rest until needed
+        lazy = AsusDataLazy(partial(method, data, history, wlan))
+        for datatype in provides:
+            state[datatype] = lazy
+
+    return state
+
+
+def _state_aura(
+    data: dict[str, Any], _: dict[AsusData, AsusDataState], __: list[Wlan]
+) -> dict[AsusData, Any]:
+    """Get Aura state."""
+
+    return {AsusData.AURA: process_aura(data)}
 
-    # Aura
-    if "ledg_scheme" in data:
-        state[AsusData.AURA] = process_aura(data)
 
-    # CPU
-    if "cpu_usage" in data:
-        cpu_usage = data.get("cpu_usage", {})
-        prev_cpu: Optional[AsusDataState] = history.get(AsusData.CPU)
-        state[AsusData.CPU] = (
+def _state_cpu(
+    data: dict[str, Any], history: dict[AsusData, AsusDataState], _: list[Wlan]
+) -> dict[AsusData, Any]:
+    """Get CPU state."""
+
+    cpu_usage = data.get("cpu_usage", {})
+    prev_cpu: Optional[AsusDataState] = history.get(AsusData.CPU)
+    return {
+        AsusData.CPU: (
             process_cpu(cpu_usage, prev_cpu)
             if cpu_usage
             else prev_cpu.data
             if isinstance(prev_cpu, AsusDataState)
             else {}
         )
+    }
+
 
-    # GWLAN
-    if (
-        "wl0.1_wpa_psk" in data
-        or "wl1.1_wpa_psk" in data
-        or "wl2.1_wpa_psk" in data
-        or "wl3.1_wpa_psk" in data
-    ):
-        state[AsusData.GWLAN] = process_gwlan(data, wlan)
-
-    # LED
-    if "led_val" in data:
-        state[AsusData.LED] = {
+def _state_gwlan(
+    data: dict[str, Any], _: dict[AsusData, AsusDataState], wlan: list[Wlan]
+) -> dict[AsusData, Any]:
+    """Get GWLAN state."""
+
+    return {AsusData.GWLAN: process_gwlan(data, wlan)}
+
+
+def _state_led(
+    data: dict[str, Any], _: dict[AsusData, AsusDataState], __: list[Wlan]
+) -> dict[AsusData, Any]:
+    """Get LED state."""
+
+    return {
+        AsusData.LED: {
             "state": AsusLED(safe_int(data.get("led_val"), default=-999))
         }
+    }
+
+
+def _state_network(
+    data: dict[str, Any], history: dict[AsusData, AsusDataState], _: list[Wlan]
+) -> dict[AsusData, Any]:
+    """Get network state."""
 
-    # Network
-    if "netdev" in data:
-        prev_network: Optional[AsusDataState] = history.get(AsusData.NETWORK)
-        netdev = data.get("netdev")
-        state[AsusData.NETWORK] = (
+    prev_network: Optional[AsusDataState] = history.get(AsusData.NETWORK)
+    netdev = data.get("netdev")
+    return {
+        AsusData.NETWORK: (
             process_network(netdev, prev_network)
             if netdev
             else prev_network.data
             if isinstance(prev_network, AsusDataState)
             else {}
         )
+    }
 
-    # OpenVPN Server
-    if "vpn_serverx_clientlist" in data:
-        state[AsusData.OPENVPN_SERVER] = process_openvpn_server(data)
-
-    # Parental control
-    if KEY_PC_STATE in data:
-        state[AsusData.PARENTAL_CONTROL] = process_parental_control(data)
-
-    # Port forwarding
-    if KEY_PORT_FORWARDING_STATE in data:
-        state[AsusData.PORT_FORWARDING] = process_port_forwarding(data)
-
-    # RAM
-    if "memory_usage" in data:
-        memory_usage = data.get("memory_usage", {})
-        state[AsusData.RAM] = process_ram(memory_usage) if memory_usage else {}
-
-    # Speedtest
-    if "ookla_state" in data:
-        speedtest = process_speedtest(data)
-        state[AsusData.SPEEDTEST_RESULT] = speedtest.get("result")
-        state[AsusData.SPEEDTEST] = speedtest.get("data")
-
-    # VPNC
-    if "vpnc_clientlist" in data:
-        vpnc, vpnc_clientlist = process_vpnc(data)
-        state[AsusData.OPENVPN_CLIENT] = vpnc[AsusVPNType.OPENVPN]
-        state[AsusData.VPNC] = vpnc
-        state[AsusData.VPNC_CLIENTLIST] = vpnc_clientlist
-        state[AsusData.WIREGUARD_CLIENT] = vpnc[AsusVPNType.WIREGUARD]
-
-    # WAN
-    if "get_wan_unit" in data:
-        state[AsusData.WAN] = process_wan(data)
-
-    # WireGuard
-    if "get_wgsc_status" in data:
-        state[AsusData.WIREGUARD_SERVER] = process_wireguard_server(data)
-
-    # WLAN
-    if (
-        "wl0_wpa_psk" in data
-        or "wl1_wpa_psk" in data
-        or "wl2_wpa_psk" in data
-        or "wl3_wpa_psk" in data
-    ):
-        state[AsusData.WLAN] = process_wlan(data, wlan)
-    
-    # DSL
-    if (
-        "dsllog_dataratedown" in data
-        or "dsllog_datarateup" in data
-    ):
-        state[AsusData.DSL] = process_dsl(data)
 
-    return state
+def _state_openvpn_server(
+    data: dict[str, Any], _: dict[AsusData, AsusDataState], __: list[Wlan]
+) -> dict[AsusData, Any]:
+    """Get OpenVPN server state."""
+
+    return {AsusData.OPENVPN_SERVER: process_openvpn_server(data)}
+
+
+def _state_parental_control(
+    data: dict[str, Any], _: dict[AsusData, AsusDataState], __: list[Wlan]
+) -> dict[AsusData, Any]:
+    """Get parental control state."""
+
+    return {AsusData.PARENTAL_CONTROL: process_parental_control(data)}
+
+
+def _state_port_forwarding(
+    data: dict[str, Any], _: dict[AsusData, AsusDataState], __: list[Wlan]
+) -> dict[AsusData, Any]:
+    """Get port forwarding state."""
+
+    return {AsusData.PORT_FORWARDING: process_port_forwarding(data)}
+
+
+def _state_ram(
+    data: dict[str, Any], _: dict[AsusData, AsusDataState], __: list[Wlan]
+) -> dict[AsusData, Any]:
+    """Get RAM state."""
+
+    memory_usage = data.get("memory_usage", {})
+    return {AsusData.RAM: process_ram(memory_usage) if memory_usage else {}}
+
+
+def _state_speedtest(
+    data: dict[str, Any], _: dict[AsusData, AsusDataState], __: list[Wlan]
+) -> dict[AsusData, Any]:
+    """Get speedtest state."""
+
+    speedtest = process_speedtest(data)
+    return {
+        AsusData.SPEEDTEST_RESULT: speedtest.get("result"),
+        AsusData.SPEEDTEST: speedtest.get("data"),
+    }
+
+
+def _state_vpnc(
+    data: dict[str, Any], _: dict[AsusData, AsusDataState], __: list[Wlan]
+) -> dict[AsusData, Any]:
+    """Get VPNC state."""
+
+    vpnc, vpnc_clientlist = process_vpnc(data)
+    return {
+        AsusData.OPENVPN_CLIENT: vpnc[AsusVPNType.OPENVPN],
+        AsusData.VPNC: vpnc,
+        AsusData.VPNC_CLIENTLIST: vpnc_clientlist,
+        AsusData.WIREGUARD_CLIENT: vpnc[AsusVPNType.WIREGUARD],
+    }
+
+
+def _state_wan(
+    data: dict[str, Any], _: dict[AsusData, AsusDataState], __: list[Wlan]
+) -> dict[AsusData, Any]:
+    """Get WAN state."""
+
+    return {AsusData.WAN: process_wan(data)}
+
+
+def _state_wireguard_server(
+    data: dict[str, Any], _: dict[AsusData, AsusDataState], __: list[Wlan]
+) -> dict[AsusData, Any]:
+    """Get WireGuard server state."""
+
+    return {AsusData.WIREGUARD_SERVER: process_wireguard_server(data)}
+
+
+def _state_wlan(
+    data: dict[str, Any], _: dict[AsusData, AsusDataState], wlan: list[Wlan]
+) -> dict[AsusData, Any]:
+    """Get WLAN state."""
+
+    return {AsusData.WLAN: process_wlan(data, wlan)}
+
+
+def _state_dsl(
+    data: dict[str, Any], _: dict[AsusData, AsusDataState], __: list[Wlan]
+) -> dict[AsusData, Any]:
+    """Get DSL state."""
+
+    return {AsusData.DSL: process_dsl(data)}
+
+
+# Marker keys in the hook data, datatypes provided and the method
+# to get them
+HOOK_STATE: tuple[
+    tuple[
+        tuple[str, ...],
+        tuple[AsusData, ...],
+        Callable[
+            [dict[str, Any], dict[AsusData, AsusDataState], list[Wlan]],
+            dict[AsusData, Any],
+        ],
+    ],
+    ...,
+] = (
+    (("ledg_scheme",), (AsusData.AURA,), _state_aura),
+    (("cpu_usage",), (AsusData.CPU,), _state_cpu),
+    (
+        ("wl0.1_wpa_psk", "wl1.1_wpa_psk", "wl2.1_wpa_psk", "wl3.1_wpa_psk"),
+        (AsusData.GWLAN,),
+        _state_gwlan,
+    ),
+    (("led_val",), (AsusData.LED,), _state_led),
+    (("netdev",), (AsusData.NETWORK,), _state_network),
+    (
+        ("vpn_serverx_clientlist",),
+        (AsusData.OPENVPN_SERVER,),
+        _state_openvpn_server,
+    ),
+    ((KEY_PC_STATE,), (AsusData.PARENTAL_CONTROL,), _state_parental_control),
+    (
+        (KEY_PORT_FORWARDING_STATE,),
+        (AsusData.PORT_FORWARDING,),
+        _state_port_forwarding,
+    ),
+    (("memory_usage",), (AsusData.RAM,), _state_ram),
+    (
+        ("ookla_state",),
+        (AsusData.SPEEDTEST_RESULT, AsusData.SPEEDTEST),
+        _state_speedtest,
+    ),
+    (
+        ("vpnc_clientlist",),
+        (
+            AsusData.OPENVPN_CLIENT,
+            AsusData.VPNC,
+            AsusData.VPNC_CLIENTLIST,
+            AsusData.WIREGUARD_CLIENT,
+        ),
+        _state_vpnc,
+    ),
+    (("get_wan_unit",), (AsusData.WAN,), _state_wan),
+    (
+        ("get_wgsc_status",),
+        (AsusData.WIREGUARD_SERVER,),
+        _state_wireguard_server,
+    ),
+    (
+        ("wl0_wpa_psk", "wl1_wpa_psk", "wl2_wpa_psk", "wl3_wpa_psk"),
+        (AsusData.WLAN,),
+        _state_wlan,
+    ),
+    (
+        ("dsllog_dataratedown", "dsllog_datarateup"),
+        (AsusData.DSL,),
+        _state_dsl,
+    ),
+)
 
 
 def process_cpu(
@@ -189,11 +340,16 @@ def process_cpu(
         for item, after in cpu.items():
             if item in prev_cpu:
                 before = prev_cpu[item]
-                after["usage"] = safe_usage_historic(
-                    after["used"],
-                    after["total"],
-                    before["used"],
-                    before["total"],
+                used = counter_delta(
+                    after["used"], before["used"], CPU_COUNTER_SIZE
+                )
+                total = counter_delta(
+                    after["total"], before["total"], CPU_COUNTER_SIZE
+                )
+                after["usage"] = (
+                    safe_usage(used, total)
+                    if used is not None and total is not None
+                    else 0.0
                 )
 
     return cpu
@@ -269,31 +425,35 @@ def process_network_speed(
 ) -> dict[str, dict[str, float]]:
     """Calculate network speed for a set period of time."""
 
-    # Check values one by one
-    for interface in network:
+    for interface, traffic in network.items():
         # Skip if there is no previous data
-        if interface not in prev_network:
+        prev_traffic = prev_network.get(interface)
+        if prev_traffic is None:
             continue
 
         # Dictionary with speed values
         interface_speed = {}
 
-        # Calculate speed for each traffic type
-        for traffic_type, traffic_value in network[interface].items():
-            prev_traffic_value = prev_network[interface].get(traffic_type)
-            # Calculate speed only if previous value is available
-            if prev_traffic_value:
-                interface_speed[f"{traffic_type}_speed"] = 8 * safe_speed(
+        # Calculate speed for each traffic type. Without a previous value,
+        # after a counter reset or an implausible jump, the speed is set to 0
+        for traffic_type, traffic_value in traffic.items():
+            prev_traffic_value = prev_traffic.get(traffic_type)
+            delta = (
+                counter_delta(
                     traffic_value,
                     prev_traffic_value,
-                    time_delta,
+                    NETDEV_COUNTER_SIZE,
+                    NETDEV_MAX_RATE * time_delta,
                 )
-                continue
-            # Otherwise, set speed to 0
-            interface_speed[f"{traffic_type}_speed"] = 0.0
+                if prev_traffic_value is not None and time_delta
+                else None
+            )
+            interface_speed[f"{traffic_type}_speed"] = (
+                8 * delta / time_delta if delta is not None else 0.0
+            )
 
         # Update interface with speed values
-        network[interface].update(interface_speed)
+        traffic.update(interface_speed)
 
     return network
 
@@ -322,11 +482,10 @@ def process_openvpn_server(data: dict[str, Any]) -> dict[int, Any]:
     server = {}
 
     # Server data
-    for keys in MAP_OVPN_SERVER_388:
-        key, key_to_use, method = safe_unpack_keys(keys)
+    for key, key_to_use, method in COMPILED_OVPN_SERVER_388:
         state_value = data.get(key)
         if state_value:
-            server[key_to_use] = run_method(state_value, method)
+            server[key_to_use] = method(state_value) if method else state_value
 
     # Clients
     clients = server.get("clients", "")
@@ -418,11 +577,12 @@ def process_speedtest(data: dict[str, Any]) -> dict[str, Any]:
     speedtest: dict[str, Any] = {}
 
     # Convert the data
-    for keys in MAP_SPEEDTEST:
-        key, key_to_use, method = safe_unpack_keys(keys)
+    for key, key_to_use, method in COMPILED_SPEEDTEST:
         state_value = data.get(key)
         if state_value:
-            speedtest[key_to_use] = run_method(state_value, method)
+            speedtest[key_to_use] = (
+                method(state_value) if method else state_value
+            )
 
     # Get detailed result
     test_result = speedtest.pop("result", None)
@@ -508,10 +668,8 @@ def process_vpnc(
                 continue
             vpnc_id = safe_int(part[6])
             vpnc[vpnc_id] = {
-                "type": (
-                    AsusVPNType(part[1])
-                    if part[1] in [e.value for e in AsusVPNType]
-                    else AsusVPNType.UNKNOWN
+                "type": get_enum_key_by_value(
+                    AsusVPNType, part[1], AsusVPNType.UNKNOWN
                 ),
                 "id": safe_int(part[2]),
                 "name": safe_return(part[0]),
@@ -535,15 +693,11 @@ def process_vpnc(
             error_code = safe_int(part[1])
             vpnc[vpnc_id].update(
                 {
-                    "state": (
-                        AsusVPNC(state_code)
-                        if state_code in [e.value for e in AsusVPNC]
-                        else AsusVPNC.UNKNOWN
+                    "state": get_enum_key_by_value(
+                        AsusVPNC, state_code, AsusVPNC.UNKNOWN
                     ),
-                    "error": (
-                        AccessError(error_code)
-                        if error_code in [e.value for e in AccessError]
-                        else AccessError.UNKNOWN
+                    "error": get_enum_key_by_value(
+                        AccessError, error_code, AccessError.UNKNOWN
                     ),
                 }
             )
@@ -565,7 +719,7 @@ def process_vpnc(
         vpn[sorted_type][sorted_id] = info
 
     # Process WireGuard data
-    vpn[AsusVPNType.WIREGUARD] = merge_dicts(
+    merge_dicts_inplace(
         vpn[AsusVPNType.WIREGUARD], process_vpnc_wireguard(data)
     )
     # Fill missing clients with unknown state
@@ -593,13 +747,14 @@ def process_vpnc_wireguard(data: dict[str, Any]) -> dict[int, dict[str, Any]]:
 
     wireguard = {}
 
-    for num in range(1, 6):
+    for num, keys in COMPILED_VPNC_WIREGUARD:
         client = {}
-        for keys in MAP_VPNC_WIREGUARD:
-            key, key_to_use, method = safe_unpack_keys(keys)
-            state_value = data.get(f"wgc{num}_{key}")
+        for key, key_to_use, method in keys:
+            state_value = data.get(key)
             if state_value:
-                client[key_to_use] = run_method(state_value, method)
+                client[key_to_use] = (
+                    method(state_value) if method else state_value
+                )
         if client:
             wireguard[num] = client
 
@@ -612,30 +767,33 @@ def process_wan(data: dict[str, Any]) -> dict[Any, dict[str, Any]]:
     wan: dict[str | int, dict[str, Any]] = {}
 
     # General data
-    wan["internet"] = {}
-    for keys in MAP_WAN:
-        key, key_to_use, method = safe_unpack_keys(keys)
+    internet: dict[str, Any] = {}
+    for key, key_to_use, method in COMPILED_WAN:
         state_value = data.get(key)
         if state_value is not None:
-            wan["internet"][key_to_use] = run_method(state_value, method)
+            internet[key_to_use] = (
+                method(state_value) if method else state_value
+            )
+    wan["internet"] = internet
 
     # Per-interface data
-    for num in (0, 1):
-        interface = {}
-        for keys in MAP_WAN_ITEM:
-            key, key_to_use, method = safe_unpack_keys(keys)
-            state_value = data.get(f"wan{num}_{key}")
+    for num, keys, extras in COMPILED_WAN_ITEM:
+        interface: dict[str, Any] = {}
+        for key, key_to_use, method in keys:
+            state_value = data.get(key)
             if state_value is not None:
-                interface[key_to_use] = run_method(state_value, method)
-        for extra, extra_key in zip(("", "x"), ("main", "extra")):
-            interface[extra_key] = {}
-            for keys in MAP_WAN_ITEM_X:
-                key, key_to_use, method = safe_unpack_keys(keys)
-                state_value = data.get(f"wan{num}_{extra}{key}")
+                interface[key_to_use] = (
+                    method(state_value) if method else state_value
+                )
+        for extra_key, extra_keys in extras:
+            extra: dict[str, Any] = {}
+            for key, key_to_use, method in extra_keys:
+                state_value = data.get(key)
                 if state_value is not None:
-                    interface[extra_key][key_to_use] = run_method(
-                        state_value, method
+                    extra[key_to_use] = (
+                        method(state_value) if method else state_value
                     )
+            interface[extra_key] = extra
         if interface:
             wan[num] = interface
 
@@ -687,21 +845,23 @@ def process_wireguard_server(
     wireguard = {}
 
     # Server data
-    for keys in MAP_WIREGUARD_SERVER:
-        key, key_to_use, method = safe_unpack_keys(keys)
+    for key, key_to_use, method in COMPILED_WIREGUARD_SERVER:
         state_value = data.get(key)
         if state_value:
-            wireguard[key_to_use] = run_method(state_value, method)
+            wireguard[key_to_use] = (
+                method(state_value) if method else state_value
+            )
 
     # Per-client data
     wireguard["clients"] = {}
-    for num in range(1, 11):
+    for num, keys in COMPILED_WIREGUARD_CLIENT:
         client = {}
-        for keys in MAP_WIREGUARD_CLIENT:
-            key, key_to_use, method = safe_unpack_keys(keys)
-            state_value = data.get(f"wgs1_c{num}_{key}")
+        for key, key_to_use, method in keys:
+            state_value = data.get(key)
             if state_value:
-                client[key_to_use] = run_method(state_value, method)
+                client[key_to_use] = (
+                    method(state_value) if method else state_value
+                )
         if client:
             wireguard["clients"][num] = client
 
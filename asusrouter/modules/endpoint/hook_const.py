@@ -8,6 +8,7 @@ from asusrouter.modules.ip_address import read_dns_ip_address, read_ip_address_t
 from asusrouter.modules.openvpn import AsusOVPNServer
 from asusrouter.modules.wireguard import AsusWireGuardServer
 from asusrouter.tools.converters import (
+    compile_map,
     safe_bool,
     safe_int,
     safe_list_csv,
@@ -133,3 +134,29 @@ MAP_VPNC_WIREGUARD = (
     ("ep_port", "endpoint_port", safe_int),
     ("alive", "keep_alive", safe_int),
 )
+
+# Compiled maps: nvram keys for each unit with the methods
+# ready to be called
+COMPILED_OVPN_SERVER_388 = compile_map(MAP_OVPN_SERVER_388)
+COMPILED_SPEEDTEST = compile_map(MAP_SPEEDTEST)
+COMPILED_WAN = compile_map(MAP_WAN)
+COMPILED_WAN_ITEM = tuple(
+    (
+        num,
+        compile_map(MAP_WAN_ITEM, f"wan{num}_{{}}"),
+        (
+            ("main", compile_map(MAP_WAN_ITEM_X, f"wan{num}_{{}}")),
+            ("extra", compile_map(MAP_WAN_ITEM_X, f"wan{num}_x{{}}")),
+        ),
+    )
+    for num in (0, 1)
+)
+COMPILED_WIREGUARD_SERVER = compile_map(MAP_WIREGUARD_SERVER)
+COMPILED_WIREGUARD_CLIENT = tuple(
+    (num, compile_map(MAP_WIREGUARD_CLIENT, f"wgs1_c{num}_{{}}"))
+    for num in range(1, 11)
+)
+COMPILED_VPNC_WIREGUARD = tuple(
+    (num, compile_map(MAP_VPNC_WIREGUARD, f"wgc{num}_{{}}"))
+    for num in range(1, 6)
+)
@@ -2,9 +2,10 @@
 
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Optional
 
 from asusrouter.modules.data import AsusData
+from asusrouter.tools.converters import safe_float
 from asusrouter.tools.readers import read_json_content as read  # noqa: F401
 
 
@@ -14,3 +15,21 @@ def process(data: dict[str, Any]) -> dict[AsusData, Any]:
     return {
         AsusData.PING: data,
     }
+
+
+def process_ping(data: dict[str, Any]) -> dict[str, Optional[float]]:
+    """Process the ping result.
+
+    The result can be wrapped in a `result` list by some firmware."""
+
+    result = data.get("result", data)
+    if isinstance(result, list):
+        result = result[0] if result else {}
+    if not isinstance(result, dict):
+        result = {}
+
+    return {
+        "loss": safe_float(result.get("loss")),
+        "avg": safe_float(result.get("ping", result.get("avg"))),
+        "jitter": safe_float(result.get("jitter")),
+    }
@@ -4,13 +4,17 @@ from __future__ import annotations
 
 import logging
 import re
-from json import JSONDecodeError
+from json import JSONDecodeError, JSONDecoder
 from typing import Any, Optional
 from urllib import parse
 
 from asusrouter.modules.data import AsusData
 from asusrouter.tools.cleaners import clean_dict, clean_dict_key
-from asusrouter.tools.readers import merge_dicts, read_json_content, readable_mac
+from asusrouter.tools.readers import (
+    merge_dicts_inplace,
+    read_json_content,
+    readable_mac,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,32 +25,123 @@ LEGACY_WLAN: dict[str, int] = {
     "5g_2": 3,
 }
 
+# Markers around the clients data
+ORIGIN_DATA_START = "originData = "
+ORIGIN_DATA_END = "networkmap_fullscan = "
+
+# Legacy JS calls to be removed from the content
+LEGACY_JS_CALLS = re.compile(
+    r"\.replace\(/&#62/g, [\"']>[\"']\)"
+    r"|\.replace\(/&#60/g, [\"']<[\"']\)"
+    r"|\.split\([\"'][<>][\"']\)"
+    r"|decodeURIComponent\("
+    r"|\)"
+)
+LEGACY_QUOTES = str.maketrans("'", '"')
+LEGACY_KEY = re.compile(r", ?([a-zA-Z0-9_]+):")
+LEGACY_WLAN_LIST = re.compile(r'"(wlList_(?:2g|5g|5g_2))": \[([^\]]*)\]')
+
+_DECODER = JSONDecoder()
+_KEY = re.compile(
+    r'(?:"([^"\\]*)"|(fromNetworkmapd|nmpClient))[ \t\n\r]*:[ \t\n\r]*'
+)
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
 
 def read(content: str) -> dict[str, Any]:
     """Read update clients data"""
 
-    update_clients: dict[str, Any] = {}
-
     # Our JSON data is between `originData =` and `networkmap_fullscan = `
-    regex = re.compile(r"originData = (.*)networkmap_fullscan = ")
-    match = regex.search(content.replace("\n", ""))
-    if match:
-        # Old firmwares have a different format
-        if "staticList" in match.group(1):
-            _LOGGER.debug("Reading legacy update clients data")
-            return read_legacy(match.group(1))
-        # Modern firmware
-        _LOGGER.debug("Reading modern update clients data")
-        content = (
-            match.group(1)
-            .replace("fromNetworkmapd", '"fromNetworkmapd"')
-            .replace("nmpClient :", '"nmpClient" :')
-        )
-
-        # Read the json content
-        update_clients = read_json_content(content)
-
-    return update_clients
+    bounds = find_origin_data(content)
+    if bounds is None:
+        return {}
+    start, end = bounds
+
+    # Old firmwares have a different format
+    if content.find("staticList", start, end) != -1:
+        _LOGGER.debug("Reading legacy update clients data")
+        return read_legacy(content[start:end].replace("\n", ""))
+
+    # Modern firmware
+    _LOGGER.debug("Reading modern update clients data")
+    update_clients = scan_origin_data(content, start, end)
+    if update_clients is not None:
+        return update_clients
+
+    # Anything the scanner cannot decode goes through the generic reader
+    # which is able to fix the content before decoding it
+    _LOGGER.debug("Falling back to the full update clients reader")
+    data = (
+        content[start:end]
+        .replace("\n", "")
+        .replace("fromNetworkmapd", '"fromNetworkmapd"')
+        .replace("nmpClient :", '"nmpClient" :')
+    )
+    return read_json_content(data)
+
+
+def find_origin_data(content: str) -> Optional[tuple[int, int]]:
+    """Find the offsets of the `originData` object in the content.
+
+    The end offset points to the last `networkmap_fullscan` marker,
+    same as a greedy match between the markers would."""
+
+    start = content.find(ORIGIN_DATA_START)
+    if start == -1:
+        return None
+    start += len(ORIGIN_DATA_START)
+
+    end = content.rfind(ORIGIN_DATA_END, start)
+    if end == -1:
+        return None
+
+    return start, end
+
+
+def scan_origin_data(
+    content: str, start: int, end: int
+) -> Optional[dict[str, Any]]:
+    """Decode the modern `originData` object in a single pass.
+
+    Values are decoded directly from the content by their offsets, so
+    no intermediate copies of the (possibly huge) content are created.
+    Returns None if the object cannot be decoded as is."""
+
+    data: dict[str, Any] = {}
+
+    position = _WHITESPACE.match(content, start, end).end()
+    if not content.startswith("{", position, end):
+        return None
+    position = _WHITESPACE.match(content, position + 1, end).end()
+
+    while not content.startswith("}", position, end):
+        # Keys are either bare or quoted
+        key_match = _KEY.match(content, position, end)
+        if not key_match:
+            return None
+        key = key_match.group(1) or key_match.group(2)
+
+        # Values are strict JSON
+        try:
+            value, position = _DECODER.raw_decode(content, key_match.end())
+        except JSONDecodeError:
+            return None
+        if position > end:
+            return None
+        data[key] = value
+
+        # Next key or the end of the object
+        position = _WHITESPACE.match(content, position, end).end()
+        if content.startswith(",", position, end):
+            position = _WHITESPACE.match(content, position + 1, end).end()
+        elif not content.startswith("}", position, end):
+            return None
+
+    # Nothing but whitespace is allowed after the object
+    if _WHITESPACE.match(content, position + 1, end).end() != end:
+        return None
+
+    return data
 
 
 def read_legacy(content: str) -> dict[str, Any]:
@@ -75,21 +170,12 @@ def read_legacy(content: str) -> dict[str, Any]:
 def read_legacy_as_json(content: str) -> dict[str, Any]:
     """Read update clients data from legacy firmwares as JSON."""
 
-    # Step 0 - replace all `'` with `"`
-    data = content.replace("'", '"')
-
-    # Step 1 - remove all the replace and split statements
-    to_replace = [
-        '.replace(/&#62/g, ">")',
-        '.replace(/&#60/g, "<")',
-        '.split("<")',
-        '.split(">")',
-    ]
-    for replace in to_replace:
-        data = data.replace(replace, "")
+    # Step 1 - remove all the JS calls: `replace`, `split`,
+    # `decodeURIComponent` and the closing brackets
+    data = LEGACY_JS_CALLS.sub("", content)
 
-    # Step 2 - remove the `decodeURIComponent` statements
-    data = data.replace("decodeURIComponent(", "").replace(")", "")
+    # Step 2 - replace all `'` with `"`
+    data = data.translate(LEGACY_QUOTES)
 
     # Step 3 - Remove the `{}` in the beginning and end, also clean trailing and leading spaces
     data = data[1:-1].strip()
@@ -99,18 +185,26 @@ def read_legacy_as_json(content: str) -> dict[str, Any]:
 
     # Step 5 - replace the keys by the regex
     # Find all `, [a-zA-Z0-9_]+:` where [a-zA-Z0-9_]+ is the key and add `"` around the key
-    data = re.sub(r", ?([a-zA-Z0-9_]+):", r',"\1":', data)
+    data = LEGACY_KEY.sub(r',"\1":', data)
 
     # Step 6 - replace `customList` with `"customList"`
     data = data.replace("customList", '"customList"')
 
-    # Step 7 - find `"wlList_2g": \[[.*]\]` as well as `"wlList_5g": \[[.*]\]` and `"wlList_5g_2": \[[.*]\]`
-    # and replace them with `"wlList_2g": {[.*]}` as well as `"wlList_5g": {[.*]}` and `"wlList_5g_2": {[.*]}`
+    # Step 7 - find the first `"wlList_2g": [...]` as well as `"wlList_5g": [...]`
+    # and `"wlList_5g_2": [...]` and replace them with `"wlList_2g": {...}`, etc.
     # Keep the content inside the brackets as is
-    # Stop the regex search on the first occurence of the `]` so that we don't match the last `]`
-    data = re.sub(r'"wlList_2g": \[([^\]]*)\]', r'"wlList_2g": {\1}', data, count=1)
-    data = re.sub(r'"wlList_5g": \[([^\]]*)\]', r'"wlList_5g": {\1}', data, count=1)
-    data = re.sub(r'"wlList_5g_2": \[([^\]]*)\]', r'"wlList_5g_2": {\1}', data, count=1)
+    # Stop the search on the first occurence of the `]` so that we don't match the last `]`
+    found: set[str] = set()
+
+    def _wlan_list(match: re.Match[str]) -> str:
+        """Convert the first list for each band into a dict."""
+
+        if match.group(1) in found:
+            return match.group(0)
+        found.add(match.group(1))
+        return f'"{match.group(1)}": {{{match.group(2)}}}'
+
+    data = LEGACY_WLAN_LIST.sub(_wlan_list, data)
 
     data = "{" + data + "}"
     try:
@@ -275,7 +369,7 @@ def process(data: dict[str, Any]) -> dict[AsusData, Any]:
     }
 
     # Merge states
-    clients = merge_dicts(clients, clients_historic)
+    merge_dicts_inplace(clients, clients_historic)
     # Clean the clients
     clean_dict(clients)
     # Clean the clients from the `from` field
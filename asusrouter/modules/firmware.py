@@ -5,12 +5,23 @@ from __future__ import annotations
 import logging
 import re
 from enum import Enum
-from typing import Any, Optional
+from functools import lru_cache
+from typing import Any, Iterable, Mapping, Optional, TypeVar
 
 from asusrouter.tools.converters import clean_string, safe_int
 
 _LOGGER = logging.getLogger(__name__)
 
+_K = TypeVar("_K")
+
+FIRMWARE_PATTERN = re.compile(
+    r"^(?P<major>[39].?0.?0.?[46])?[_.]?"
+    r"(?P<minor>[0-9]{3})[_.]?"
+    r"(?P<build>[0-9]+)[_.-]?"
+    r"(?P<revision>[a-zA-Z0-9-_]+?)(?=_rog|$)?"
+    r"(?P<rog>_rog)?$"
+)
+
 
 class FirmwareType(Enum):
     """Type of firmware."""
@@ -61,7 +72,9 @@ class WebsUpgrade(Enum):
 class Firmware:
     """Firmware class.
 
-    This class contains information about the firmware of a device."""
+    This class contains information about the firmware of a device.
+    Comparisons use `sort_key`, calculated once and recalculated
+    only if the version attributes change."""
 
     def __init__(
         self,
@@ -73,6 +86,10 @@ class Firmware:
     ) -> None:
         """Initialize the firmware object."""
 
+        # Sort key and the attributes it was calculated from
+        self._key: Optional[tuple[Any, ...]] = None
+        self._key_source: Optional[tuple[Any, ...]] = None
+
         self.major: Optional[str] = None
         self.minor: Optional[int] = None
         self.build: Optional[int] = None
@@ -138,56 +155,43 @@ class Firmware:
     def from_string(self, fw_string: Optional[str] = None) -> None:
         """Read the firmware string."""
 
-        fw_string = clean_string(fw_string)
-        if not fw_string:
-            return None
-
-        # Special cases for old firmwares and absent data
-        if fw_string == "__":
+        parsed = parse_firmware(fw_string)
+        if not parsed:
             return None
 
-        pattern = (
-            r"^(?P<major>[39].?0.?0.?[46])?[_.]?"
-            r"(?P<minor>[0-9]{3})[_.]?"
-            r"(?P<build>[0-9]+)[_.-]?"
-            r"(?P<revision>[a-zA-Z0-9-_]+?)(?=_rog|$)?"
-            r"(?P<rog>_rog)?$"
+        (
+            self.major,
+            self.minor,
+            self.build,
+            self.revision,
+            self.rog,
+            self.beta,
+        ) = parsed
+
+    @property
+    def sort_key(self) -> tuple[Any, ...]:
+        """Return the key to sort firmware versions.
+
+        Versions of different sources are grouped by the source."""
+
+        source = (
+            self.source,
+            self.major,
+            self.minor,
+            self.build,
+            self.revision,
         )
-
-        re_match = re.match(pattern, fw_string)
-        if not re_match:
-            _LOGGER.warning(
-                "Firmware version cannot be parsed. \
-                    Please report this. The original FW string is: `%s`"
-                % fw_string
+        if self._key is None or self._key_source != source:
+            self._key_source = source
+            self._key = (
+                self.source.value,
+                _major_key(self.major),
+                _value_key(self.minor),
+                _value_key(self.build),
+                _value_key(self.revision),
             )
-            return None
 
-        # Major version
-        major = re_match.group("major")
-        major = (
-            major[0] + "." + major[1] + "." + major[2] + "." + major[3]
-            if major and "." not in major and len(major) == 4
-            else major
-        )
-        # Only if major version exists and has 0 member
-        beta = major[0] == "9" if major and len(major) > 0 else False
-        # Minor version
-        minor = safe_int(re_match.group("minor"))
-        # Build version
-        build = safe_int(re_match.group("build"))
-        # Revision
-        revision = re_match.group("revision")
-        revision = safe_int(revision) if revision.isdigit() else revision
-        # ROG flag (Merlin firmware)
-        rog = re_match.group("rog") == "_rog"
-
-        self.major = major
-        self.minor = minor
-        self.build = build
-        self.revision = revision
-        self.rog = rog
-        self.beta = beta
+        return self._key
 
     def __str__(self) -> str:
         """Return the firmware version as a string."""
@@ -217,109 +221,170 @@ class Firmware:
             and self.revision == other.revision
         )
 
-    def __lt__(self, other: object) -> bool:
-        """Compare two firmware versions."""
+    def __hash__(self) -> int:
+        """Hash the firmware version consistently with `__eq__`."""
+
+        return hash((self.major, self.minor, self.build, self.revision))
+
+    def _other_key(self, other: object) -> Optional[tuple[Any, ...]]:
+        """Get the sort key of the other firmware if they can be compared."""
 
         if not isinstance(other, Firmware):
             _LOGGER.debug("Cannot compare Firmware with other object")
-            return False
+            return None
 
         if self.source != other.source:
             _LOGGER.debug("Cannot compare different firmware sources")
-            return False
-
-        if self.beta != other.beta:
-            _LOGGER.debug("Comparing beta and non-beta firmware")
+            return None
 
         if not self.major or not other.major:
-            return False
+            return None
 
-        # Remove beta digit from the major version
-        major_1 = [int(x) for x in self.major.split(".")[1:]]
-        major_2 = [int(x) for x in other.major.split(".")[1:]]
-
-        def get_prefix(v: str) -> str:
-            """Get the prefix of the version."""
-
-            if "alpha" in v:
-                return clean_string(v.split("alpha")[0]) or "-1"
-            if "beta" in v:
-                return clean_string(v.split("beta")[0]) or "-1"
-            # We should not reach this point ever if
-            # attributes of Firmware were not manually overwritten
-            _LOGGER.warning(
-                "Code execution reached an unexpected point"
-                + " in Firmware.__lt__.get_prefix()."
-                + " Trying to compare %s and %s" % (self, other)
-            )
-            return v
-
-        def lt_values(v1: Any, v2: Any) -> bool:
-            """Check whether one value is less than the other."""
-
-            if v2 is None:
-                return False
-            elif v1 is None:
-                return True
-
-            if isinstance(v1, int) and isinstance(v2, int):
-                return v1 < v2
-            if isinstance(v1, str) and isinstance(v2, str):
-                return v1 < v2
-            if isinstance(v1, list) and isinstance(v2, list):
-                for i in range(min(len(v1), len(v2))):
-                    if v1[i] < v2[i]:
-                        return True
-                    if v2[i] < v1[i]:
-                        return False
-            # Case of beta / alpha
-            if isinstance(v1, int) and isinstance(v2, str):
-                _prefix = get_prefix(v2)
-                _v1 = str(v1)
-                # This case will solve `1 vs 1beta1`
-                if _v1 == _prefix:
-                    return False
-                # Everything else can be compared as strings
-                return str(v1) < _prefix
-            if isinstance(v1, str) and isinstance(v2, int):
-                _prefix = get_prefix(v1)
-                _v2 = str(v2)
-                # This case will solve `1 vs 1beta1`
-                if _v2 == _prefix:
-                    return True
-                # Everything else can be compared as strings
-                return _prefix < str(v2)
+        return other.sort_key
 
-            return False
+    def __lt__(self, other: object) -> bool:
+        """Compare two firmware versions."""
 
-        # Compare the major version
-        if lt_values(major_1, major_2):
-            return True
-        if lt_values(major_2, major_1):
-            return False
+        key = self._other_key(other)
+        return key is not None and self.sort_key < key
 
-        # Compare the minor version
-        if lt_values(self.minor, other.minor):
-            return True
-        if lt_values(other.minor, self.minor):
-            return False
+    def __le__(self, other: object) -> bool:
+        """Compare two firmware versions."""
 
-        # Compare the build version
-        if lt_values(self.build, other.build):
-            return True
-        if lt_values(other.build, self.build):
-            return False
+        key = self._other_key(other)
+        return key is not None and self.sort_key <= key
 
-        # Compare the revision version
-        if lt_values(self.revision, other.revision):
-            return True
-        if lt_values(other.revision, self.revision):
-            return False
+    def __gt__(self, other: object) -> bool:
+        """Compare two firmware versions."""
 
-        return False
+        key = self._other_key(other)
+        return key is not None and self.sort_key > key
 
-    def __gt__(self, other: object) -> bool:
+    def __ge__(self, other: object) -> bool:
         """Compare two firmware versions."""
 
-        # Invert the statement of less-than
-        return not self.__lt__(other) and self.__ne__(other)
+        key = self._other_key(other)
+        return key is not None and self.sort_key >= key
+
+
+@lru_cache(maxsize=256)
+def parse_firmware(
+    fw_string: Optional[str],
+) -> Optional[tuple[Any, ...]]:
+    """Parse the firmware string into major, minor, build, revision,
+    ROG and beta values.
+
+    The results are cached, since the same versions are met
+    over and over again."""
+
+    fw_string = clean_string(fw_string)
+    if not fw_string:
+        return None
+
+    # Special cases for old firmwares and absent data
+    if fw_string == "__":
+        return None
+
+    re_match = FIRMWARE_PATTERN.match(fw_string)
+    if not re_match:
+        _LOGGER.warning(
+            "Firmware version cannot be parsed. \
+                Please report this. The original FW string is: `%s`"
+            % fw_string
+        )
+        return None
+
+    # Major version
+    major = re_match.group("major")
+    major = (
+        major[0] + "." + major[1] + "." + major[2] + "." + major[3]
+        if major and "." not in major and len(major) == 4
+        else major
+    )
+    # Only if major version exists and has 0 member
+    beta = major[0] == "9" if major and len(major) > 0 else False
+    # Minor version
+    minor = safe_int(re_match.group("minor"))
+    # Build version
+    build = safe_int(re_match.group("build"))
+    # Revision
+    revision = re_match.group("revision")
+    revision = safe_int(revision) if revision.isdigit() else revision
+    # ROG flag (Merlin firmware)
+    rog = re_match.group("rog") == "_rog"
+
+    return major, minor, build, revision, rog, beta
+
+
+def _major_key(major: Optional[str]) -> tuple[Any, ...]:
+    """Get the sort key of the major version without the beta digit."""
+
+    if not major:
+        return (0,)
+
+    return (1, tuple(safe_int(x, default=-1) for x in major.split(".")[1:]))
+
+
+def _value_key(value: Any) -> tuple[Any, ...]:
+    """Get the sort key of a version value.
+
+    Missing values go first. An alpha / beta version goes right before
+    the release with the same number, e.g. `1beta2` < `1` < `2alpha1`."""
+
+    if value is None:
+        return (0,)
+
+    if isinstance(value, int):
+        return (1, value, 1, "")
+
+    value = str(value)
+    for marker in ("alpha", "beta"):
+        if marker in value:
+            prefix = safe_int(value.split(marker)[0], default=-1)
+            return (1, prefix, 0, value)
+
+    return (2, value)
+
+
+# Versions used to choose the device API
+FIRMWARE_388 = Firmware(major="3.0.0.4", minor=388, build=0)
+
+
+def need_upgrade(
+    firmwares: Mapping[_K, Optional[Firmware | str]],
+    latest: Firmware | str | Iterable[Firmware | str],
+) -> list[_K]:
+    """Get the devices with the firmware older than the latest one.
+
+    Several latest versions can be provided, e.g. for stock and Merlin.
+    Each device is compared with the latest version of its firmware source.
+    The devices are returned from the oldest firmware."""
+
+    if isinstance(latest, (Firmware, str)):
+        latest = [latest]
+
+    # The newest version for each firmware source
+    targets: dict[FirmwareType, Firmware] = {}
+    for version in latest:
+        target = (
+            version if isinstance(version, Firmware) else Firmware(version)
+        )
+        if not target.safe():
+            continue
+        current = targets.get(target.source)
+        if current is None or current < target:
+            targets[target.source] = target
+
+    outdated: list[tuple[tuple[Any, ...], _K]] = []
+    for device, version in firmwares.items():
+        if version is None:
+            continue
+        firmware = (
+            version if isinstance(version, Firmware) else Firmware(version)
+        )
+        target = targets.get(firmware.source)
+        if target is not None and firmware < target:
+            outdated.append((firmware.sort_key, device))
+
+    outdated.sort(key=lambda item: item[0])
+    return [device for _, device in outdated]
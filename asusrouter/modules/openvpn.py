@@ -6,7 +6,7 @@ import logging
 from enum import IntEnum
 from typing import Any, Awaitable, Callable
 
-from asusrouter.modules.firmware import Firmware
+from asusrouter.modules.firmware import FIRMWARE_388
 from asusrouter.tools.converters import get_arguments
 
 _LOGGER = logging.getLogger(__name__)
@@ -71,7 +71,7 @@ async def set_state(
     if (
         not identity
         or identity.merlin
-        or identity.firmware < Firmware(major="3.0.0.4", minor=388, build=0)
+        or identity.firmware < FIRMWARE_388
     ):
         service_map = {
             (AsusOVPNClient, AsusOVPNClient.ON): f"start_vpnclient{vpn_id}",
@@ -0,0 +1,237 @@
+"""Presence module.
+
+This module keeps the log of clients joining and leaving the network
+and moving between the AiMesh nodes. The events are found by comparing
+the successive clients data, and are grouped into sessions per client."""
+
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Optional
+
+from asusrouter.modules.client import AsusClient
+from asusrouter.modules.connection import ConnectionState
+
+DEFAULT_PRESENCE_CLIENTS = 1024
+DEFAULT_PRESENCE_EVENTS = 4096
+DEFAULT_PRESENCE_SESSIONS = 32
+
+
+class PresenceEventType(str, Enum):
+    """Presence event type enum."""
+
+    JOIN = "join"
+    LEAVE = "leave"
+    ROAM = "roam"
+
+
+@dataclass
+class PresenceEvent:
+    """Presence event class.
+
+    `node` is the node the client is connected to after the event
+    and `node_old` before it."""
+
+    timestamp: datetime
+    mac: str
+    type: PresenceEventType
+    node: Optional[str] = None
+    node_old: Optional[str] = None
+
+
+@dataclass
+class PresenceSession:
+    """Presence session class.
+
+    The session is open (the client is online) while `end` is None."""
+
+    mac: str
+    start: datetime
+    end: Optional[datetime] = None
+    roams: int = 0
+
+    def duration(self, now: Optional[datetime] = None) -> float:
+        """Get the session duration in seconds."""
+
+        end = self.end or now or datetime.now(timezone.utc)
+        return max(0.0, (end - self.start).total_seconds())
+
+
+class PresenceLog:
+    """Log of the client presence events."""
+
+    def __init__(
+        self,
+        events: int = DEFAULT_PRESENCE_EVENTS,
+        sessions: int = DEFAULT_PRESENCE_SESSIONS,
+        clients: int = DEFAULT_PRESENCE_CLIENTS,
+    ) -> None:
+        """Initialize the log.
+
+        Only the last `events` events and the last `sessions` sessions
+        for each of the last active `clients` are kept."""
+
+        self._events: deque[PresenceEvent] = deque(maxlen=events)
+        self._max_sessions = sessions
+        self._max_clients = clients
+
+        # Clients online after the last update and their nodes
+        self._online: dict[str, Optional[str]] = {}
+        # Sessions per client, the least recently active first
+        self._sessions: OrderedDict[str, deque[PresenceSession]] = (
+            OrderedDict()
+        )
+
+    def _add(self, event: PresenceEvent) -> None:
+        """Add the event and update the sessions."""
+
+        self._events.append(event)
+
+        sessions = self._sessions.get(event.mac)
+        if sessions is None:
+            sessions = self._sessions[event.mac] = deque(
+                maxlen=self._max_sessions
+            )
+        self._sessions.move_to_end(event.mac)
+
+        if event.type == PresenceEventType.JOIN:
+            sessions.append(PresenceSession(event.mac, event.timestamp))
+        elif sessions and sessions[-1].end is None:
+            if event.type == PresenceEventType.LEAVE:
+                sessions[-1].end = event.timestamp
+            else:
+                sessions[-1].roams += 1
+
+    def update(
+        self,
+        clients: dict[str, AsusClient],
+        timestamp: Optional[datetime] = None,
+    ) -> list[PresenceEvent]:
+        """Update the log with the new clients data.
+
+        Returns the events found."""
+
+        timestamp = timestamp or datetime.now(timezone.utc)
+
+        online: dict[str, Optional[str]] = {
+            mac: client.connection.node
+            for mac, client in clients.items()
+            if client.state == ConnectionState.CONNECTED
+            and client.connection is not None
+        }
+
+        events: list[PresenceEvent] = []
+        for mac, node in online.items():
+            if mac not in self._online:
+                events.append(
+                    PresenceEvent(timestamp, mac, PresenceEventType.JOIN, node)
+                )
+            elif self._online[mac] != node:
+                events.append(
+                    PresenceEvent(
+                        timestamp,
+                        mac,
+                        PresenceEventType.ROAM,
+                        node,
+                        self._online[mac],
+                    )
+                )
+        for mac, node in self._online.items():
+            if mac not in online:
+                events.append(
+                    PresenceEvent(
+                        timestamp, mac, PresenceEventType.LEAVE, None, node
+                    )
+                )
+
+        self._online = online
+        for event in events:
+            self._add(event)
+
+        # Forget the least recently active clients which are offline
+        excess = len(self._sessions) - self._max_clients
+        if excess > 0:
+            offline = [mac for mac in self._sessions if mac not in online]
+            for mac in offline[:excess]:
+                del self._sessions[mac]
+
+        return events
+
+    def events(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        mac: Optional[str] = None,
+    ) -> list[PresenceEvent]:
+        """Get the events with start <= timestamp < end, oldest first.
+
+        The log is read from the newest event, so recent periods
+        are found without going through the whole log."""
+
+        found: list[PresenceEvent] = []
+        for event in reversed(self._events):
+            if start is not None and event.timestamp < start:
+                break
+            if end is not None and event.timestamp >= end:
+                continue
+            if mac is None or event.mac == mac:
+                found.append(event)
+
+        found.reverse()
+        return found
+
+    def sessions(
+        self,
+        mac: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> list[PresenceSession]:
+        """Get the sessions of the client overlapping the period."""
+
+        return [
+            session
+            for session in self._sessions.get(mac, ())
+            if (start is None or session.end is None or session.end > start)
+            and (end is None or session.start < end)
+        ]
+
+    def online_time(
+        self,
+        mac: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> float:
+        """Get the time in seconds the client was online in the period."""
+
+        end = end or datetime.now(timezone.utc)
+
+        total = 0.0
+        for session in self.sessions(mac, start, end):
+            session_start = (
+                max(session.start, start) if start else session.start
+            )
+            session_end = min(session.end, end) if session.end else end
+            total += max(0.0, (session_end - session_start).total_seconds())
+
+        return total
+
+    def is_online(self, mac: str) -> bool:
+        """Check whether the client is online."""
+
+        return mac in self._online
+
+    def last_seen(self, mac: str) -> Optional[datetime]:
+        """Get the time the client was last seen online.
+
+        The current time is returned for an online client."""
+
+        if mac in self._online:
+            return datetime.now(timezone.utc)
+
+        sessions = self._sessions.get(mac)
+        if not sessions:
+            return None
+        return sessions[-1].end
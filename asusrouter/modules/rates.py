@@ -0,0 +1,147 @@
+"""Rates module.
+
+This module calculates rates from the growing counters reported by
+the device (network traffic, CPU time) and smooths them if needed."""
+
+from __future__ import annotations
+
+from collections import deque
+from enum import Enum
+from typing import Any, Hashable, Optional, TypeVar
+
+_K = TypeVar("_K", bound=Hashable)
+
+COUNTER_32 = 2**32
+COUNTER_64 = 2**64
+
+DEFAULT_RATE_ALPHA = 0.3
+DEFAULT_RATE_WINDOW = 5
+
+
+class RateMode(str, Enum):
+    """Rate smoothing mode enum."""
+
+    RAW = "raw"
+    EWMA = "ewma"
+    WINDOW = "window"
+
+
+def counter_delta(
+    current: int | float,
+    previous: int | float,
+    size: int = COUNTER_64,
+    limit: Optional[float] = None,
+) -> Optional[int | float]:
+    """Get the difference between two readings of a growing counter.
+
+    `size` is the range of the counter, which depends on the source. A
+    decrease is either a wrap of the counter or a reset (e.g. after a
+    reboot). A wrap can only happen from the top of the range to the
+    bottom, so the difference is less than half of the range. Otherwise
+    it is a reset and the difference is unknown (None). A difference
+    above `limit` is not plausible for the interval and unknown too."""
+
+    if current >= previous:
+        delta = current - previous
+    elif previous < size:
+        delta = size - previous + current
+        if delta > size // 2:
+            return None
+    else:
+        return None
+
+    if limit is not None and delta > limit:
+        return None
+
+    return delta
+
+
+class RateSmoother:
+    """Rate smoother class.
+
+    Keeps the smoothing state for each key between the updates."""
+
+    def __init__(
+        self,
+        mode: RateMode = RateMode.RAW,
+        alpha: float = DEFAULT_RATE_ALPHA,
+        window: int = DEFAULT_RATE_WINDOW,
+    ) -> None:
+        """Initialize the smoother.
+
+        `alpha` is the weight of the new value for EWMA and `window`
+        is the number of values averaged in the window mode."""
+
+        self.mode = mode
+        self._alpha = alpha
+        self._window = window
+
+        self._ewma: dict[Hashable, float] = {}
+        self._values: dict[Hashable, deque[float]] = {}
+        self._sums: dict[Hashable, float] = {}
+
+    def _smooth_ewma(self, key: Hashable, value: float) -> float:
+        """Smooth the value with the exponentially weighted moving average."""
+
+        last = self._ewma.get(key)
+        if last is not None:
+            value = self._alpha * value + (1 - self._alpha) * last
+        self._ewma[key] = value
+        return value
+
+    def _smooth_window(self, key: Hashable, value: float) -> float:
+        """Smooth the value with the average of the last values."""
+
+        values = self._values.get(key)
+        if values is None:
+            values = self._values[key] = deque(maxlen=self._window)
+            self._sums[key] = 0.0
+        if len(values) == self._window:
+            self._sums[key] -= values[0]
+        values.append(value)
+        self._sums[key] += value
+        return self._sums[key] / len(values)
+
+    def smooth(self, rates: dict[_K, Optional[float]]) -> dict[_K, float]:
+        """Smooth the rates.
+
+        Unknown rates (None) keep the last smoothed value."""
+
+        smoothed: dict[_K, float] = {}
+        for key, value in rates.items():
+            if value is None:
+                if self.mode == RateMode.EWMA:
+                    smoothed[key] = self._ewma.get(key, 0.0)
+                elif self.mode == RateMode.WINDOW and self._values.get(key):
+                    smoothed[key] = self._sums[key] / len(self._values[key])
+                else:
+                    smoothed[key] = 0.0
+                continue
+            if self.mode == RateMode.EWMA:
+                smoothed[key] = self._smooth_ewma(key, value)
+            elif self.mode == RateMode.WINDOW:
+                smoothed[key] = self._smooth_window(key, value)
+            else:
+                smoothed[key] = value
+
+        return smoothed
+
+    def smooth_fields(
+        self, data: dict[Any, Any], fields: tuple[str, ...]
+    ) -> dict[Any, Any]:
+        """Smooth the selected fields of a two-level dict in place."""
+
+        if self.mode == RateMode.RAW:
+            return data
+
+        rates = {
+            (outer, field): values[field]
+            for outer, values in data.items()
+            if isinstance(values, dict)
+            for field in fields
+            if isinstance(values.get(field), (int, float))
+        }
+        for (outer, field), value in self.smooth(rates).items():
+            data[outer][field] = value
+
+        return data
@@ -0,0 +1,123 @@
+"""Subscription module.
+
+This module compares the successive values of the state data,
+so that the subscribers are only called when the data changes."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+
+from asusrouter.modules.data import AsusData
+
+
+@dataclass
+class DataDiff:
+    """Difference between two values of the data.
+
+    Data which is not a dict is compared as a whole and reported
+    as changed with the key None."""
+
+    added: dict[Any, Any] = field(default_factory=dict)
+    removed: dict[Any, Any] = field(default_factory=dict)
+    changed: dict[Any, tuple[Any, Any]] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        """Check whether there is any difference."""
+
+        return bool(self.added or self.removed or self.changed)
+
+    def keys(self) -> set[Any]:
+        """Get all the keys which differ."""
+
+        return {*self.added, *self.removed, *self.changed}
+
+    def select(self, keys: set[Any]) -> DataDiff:
+        """Get the difference only for the selected keys."""
+
+        return DataDiff(
+            added={k: v for k, v in self.added.items() if k in keys},
+            removed={k: v for k, v in self.removed.items() if k in keys},
+            changed={k: v for k, v in self.changed.items() if k in keys},
+        )
+
+
+def diff_data(old: Any, new: Any) -> DataDiff:
+    """Compare two values of the data."""
+
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        if old is None and isinstance(new, dict):
+            return DataDiff(added=dict(new))
+        if old == new:
+            return DataDiff()
+        return DataDiff(changed={None: (old, new)})
+
+    diff = DataDiff()
+    for key, value in new.items():
+        if key not in old:
+            diff.added[key] = value
+        elif old[key] != value:
+            diff.changed[key] = (old[key], value)
+    for key, value in old.items():
+        if key not in new:
+            diff.removed[key] = value
+
+    return diff
+
+
+def merge_diffs(diffs: Iterable[DataDiff]) -> DataDiff:
+    """Combine the successive differences into one."""
+
+    merged = DataDiff()
+    for diff in diffs:
+        for key, value in diff.added.items():
+            if key in merged.removed:
+                merged.changed[key] = (merged.removed.pop(key), value)
+            else:
+                merged.added[key] = value
+        for key, value in diff.removed.items():
+            if key in merged.added:
+                merged.added.pop(key)
+            elif key in merged.changed:
+                merged.removed[key] = merged.changed.pop(key)[0]
+            else:
+                merged.removed[key] = value
+        for key, (old, new) in diff.changed.items():
+            if key in merged.added:
+                merged.added[key] = new
+            elif key in merged.changed:
+                merged.changed[key] = (merged.changed[key][0], new)
+            else:
+                merged.changed[key] = (old, new)
+
+    # Values changed back and forth
+    for key in [k for k, (old, new) in merged.changed.items() if old == new]:
+        merged.changed.pop(key)
+
+    return merged
+
+
+@dataclass
+class DataChanges:
+    """Changes of the data since a version.
+
+    `modified` is False if nothing has changed. Otherwise, `diff` holds
+    the changes, or `data` holds the full value when the changes since
+    the version are not known (first read or too old version)."""
+
+    version: int
+    modified: bool = True
+    diff: Optional[DataDiff] = None
+    data: Any = None
+
+
+@dataclass
+class Subscription:
+    """Subscription to the data changes.
+
+    With `keys`, the callback is only called when these keys
+    of the data change and receives the difference only for them."""
+
+    datatype: AsusData
+    callback: Callable[[AsusData, DataDiff], Any]
+    keys: Optional[set[Any]] = None
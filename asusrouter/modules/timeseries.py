@@ -0,0 +1,374 @@
+"""Time series module.
+
+This module keeps the recent history of numeric metrics in memory.
+Each metric is stored in a fixed-size ring buffer, so the memory
+used does not grow with time."""
+
+from __future__ import annotations
+
+import heapq
+import math
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Callable, Iterator, Optional
+
+from asusrouter.modules.data import AsusData
+
+DEFAULT_HISTORY_RETENTION = 3600.0
+DEFAULT_HISTORY_SERIES = 1024
+DEFAULT_HISTORY_SIZE = 3600
+
+
+@dataclass
+class TimeSeriesBucket:
+    """Aggregated values for a time bucket."""
+
+    start: float
+    end: float
+    count: int
+    min: float
+    avg: float
+    max: float
+    p95: float
+
+
+class RingBuffer:
+    """Fixed-size buffer of (timestamp, value) samples.
+
+    Timestamps are seconds since epoch and must not decrease.
+    When the buffer is full, the oldest sample is overwritten."""
+
+    def __init__(self, capacity: int) -> None:
+        """Initialize the buffer."""
+
+        self.capacity = capacity
+        self._time = array("d", bytes(8 * capacity))
+        self._value = array("d", bytes(8 * capacity))
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Return the number of samples."""
+
+        return self._size
+
+    def _index(self, position: int) -> int:
+        """Convert the position from the oldest sample to the array index."""
+
+        return (self._start + position) % self.capacity
+
+    def append(self, timestamp: float, value: float) -> bool:
+        """Add a sample. Samples older than the last one are dropped."""
+
+        if self._size:
+            last = self._time[self._index(self._size - 1)]
+            if timestamp < last:
+                return False
+
+        if self._size < self.capacity:
+            index = self._index(self._size)
+            self._size += 1
+        else:
+            index = self._start
+            self._start = (self._start + 1) % self.capacity
+
+        self._time[index] = timestamp
+        self._value[index] = value
+        return True
+
+    def _bisect(self, timestamp: float) -> int:
+        """Find the position of the first sample not older than timestamp."""
+
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            if self._time[self._index(middle)] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def samples(
+        self, start: Optional[float] = None, end: Optional[float] = None
+    ) -> Iterator[tuple[float, float]]:
+        """Get the samples with start <= timestamp < end."""
+
+        first = self._bisect(start) if start is not None else 0
+        last = self._bisect(end) if end is not None else self._size
+        for position in range(first, last):
+            index = self._index(position)
+            yield self._time[index], self._value[index]
+
+    @property
+    def last(self) -> Optional[tuple[float, float]]:
+        """Get the latest sample."""
+
+        if not self._size:
+            return None
+        index = self._index(self._size - 1)
+        return self._time[index], self._value[index]
+
+
+def _aggregate(start: float, end: float, values: list[float]) -> TimeSeriesBucket:
+    """Aggregate the values of a bucket."""
+
+    values.sort()
+    count = len(values)
+    return TimeSeriesBucket(
+        start=start,
+        end=end,
+        count=count,
+        min=values[0],
+        avg=math.fsum(values) / count,
+        max=values[-1],
+        # Nearest-rank percentile
+        p95=values[max(0, math.ceil(0.95 * count) - 1)],
+    )
+
+
+def _number(value: Any) -> Optional[float]:
+    """Get the value as a float if it is a number."""
+
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def _name(key: Any) -> str:
+    """Get the key as a part of the metric name."""
+
+    return key.value if isinstance(key, Enum) else str(key)
+
+
+def _metrics_cpu(data: dict[Any, Any]) -> Iterator[tuple[str, float]]:
+    """Get CPU usage per core and in total."""
+
+    for core, values in data.items():
+        if isinstance(values, dict):
+            usage = _number(values.get("usage"))
+            if usage is not None:
+                yield f"cpu.{_name(core)}.usage", usage
+
+
+def _metrics_network(data: dict[Any, Any]) -> Iterator[tuple[str, float]]:
+    """Get traffic and speed per interface."""
+
+    for interface, values in data.items():
+        if not isinstance(values, dict):
+            continue
+        for key, value in values.items():
+            number = _number(value)
+            if number is not None:
+                yield f"network.{_name(interface)}.{key}", number
+
+
+def _metrics_ram(data: dict[Any, Any]) -> Iterator[tuple[str, float]]:
+    """Get RAM usage."""
+
+    for key, value in data.items():
+        number = _number(value)
+        if number is not None:
+            yield f"ram.{key}", number
+
+
+def _metrics_temperature(data: dict[Any, Any]) -> Iterator[tuple[str, float]]:
+    """Get temperature per sensor."""
+
+    for sensor, value in data.items():
+        number = _number(value)
+        if number is not None:
+            yield f"temperature.{_name(sensor)}", number
+
+
+def _metrics_clients(data: dict[Any, Any]) -> Iterator[tuple[str, float]]:
+    """Get connection speed and signal per client."""
+
+    for mac, client in data.items():
+        connection = getattr(client, "connection", None)
+        for key in ("rx_speed", "tx_speed", "rssi"):
+            number = _number(getattr(connection, key, None))
+            if number is not None:
+                yield f"clients.{mac}.{key}", number
+
+
+# Methods to get the metrics from the state data
+METRICS: dict[
+    AsusData, Callable[[dict[Any, Any]], Iterator[tuple[str, float]]]
+] = {
+    AsusData.CLIENTS: _metrics_clients,
+    AsusData.CPU: _metrics_cpu,
+    AsusData.NETWORK: _metrics_network,
+    AsusData.RAM: _metrics_ram,
+    AsusData.TEMPERATURE: _metrics_temperature,
+}
+
+
+class TimeSeriesStore:
+    """Store of metric histories."""
+
+    def __init__(
+        self,
+        size: int = DEFAULT_HISTORY_SIZE,
+        max_series: int = DEFAULT_HISTORY_SERIES,
+        retention: float = DEFAULT_HISTORY_RETENTION,
+    ) -> None:
+        """Initialize the store.
+
+        `size` is the number of samples kept per metric and `max_series`
+        limits the number of metrics (new clients keep adding them).
+        Metrics no longer reported (e.g. of departed clients) are removed
+        `retention` seconds after their last sample."""
+
+        self._size = size
+        self._max_series = max_series
+        self._retention = retention
+        self._series: dict[str, RingBuffer] = {}
+        self._datatypes: dict[AsusData, set[str]] = {}
+
+    def feed(
+        self,
+        datatype: AsusData,
+        data: Any,
+        timestamp: Optional[datetime] = None,
+    ) -> None:
+        """Add the metrics found in the state data."""
+
+        method = METRICS.get(datatype)
+        if method is None or not isinstance(data, dict):
+            return
+
+        time = (timestamp or datetime.now(timezone.utc)).timestamp()
+        known = self._datatypes.setdefault(datatype, set())
+        seen: set[str] = set()
+        for metric, value in method(data):
+            series = self._series.get(metric)
+            if series is None:
+                if len(self._series) >= self._max_series:
+                    continue
+                series = self._series[metric] = RingBuffer(self._size)
+                known.add(metric)
+            series.append(time, value)
+            seen.add(metric)
+
+        # Remove the metrics not reported for too long
+        for metric in known - seen:
+            last = self._series[metric].last
+            if last is None or last[0] < time - self._retention:
+                del self._series[metric]
+                known.discard(metric)
+
+    def metrics(self, prefix: str = "") -> list[str]:
+        """Get the names of the metrics available."""
+
+        return sorted(
+            metric for metric in self._series if metric.startswith(prefix)
+        )
+
+    def last(self, metric: str) -> Optional[tuple[float, float]]:
+        """Get the latest sample of the metric."""
+
+        series = self._series.get(metric)
+        return series.last if series else None
+
+    def query(
+        self,
+        metric: str,
+        window: Optional[float] = None,
+        step: Optional[float] = None,
+        end: Optional[float] = None,
+    ) -> list[TimeSeriesBucket]:
+        """Get the aggregated values of the metric.
+
+        `window` is the period in seconds before `end` (now by default),
+        the whole history is used without it. The period is split into
+        buckets `step` seconds long, or aggregated as one bucket.
+        Buckets without samples are skipped."""
+
+        series = self._series.get(metric)
+        if not series:
+            return []
+
+        if end is None:
+            end = datetime.now(timezone.utc).timestamp()
+        start = end - window if window is not None else None
+
+        buckets: list[TimeSeriesBucket] = []
+        values: list[float] = []
+        bucket_start: Optional[float] = None
+        bucket_end = end
+        for timestamp, value in series.samples(start, end):
+            if bucket_start is None:
+                bucket_start = start if start is not None else timestamp
+                bucket_end = bucket_start + step if step else end
+            if step and timestamp >= bucket_end:
+                if values:
+                    buckets.append(_aggregate(bucket_start, bucket_end, values))
+                    values = []
+                # Skip the empty buckets
+                skip = (timestamp - bucket_start) // step
+                bucket_start += skip * step
+                bucket_end = bucket_start + step
+            values.append(value)
+
+        if values and bucket_start is not None:
+            buckets.append(_aggregate(bucket_start, min(bucket_end, end), values))
+
+        return buckets
+
+    def average(
+        self,
+        metric: str,
+        window: Optional[float] = None,
+        end: Optional[float] = None,
+    ) -> Optional[float]:
+        """Get the average value of the metric over the window."""
+
+        series = self._series.get(metric)
+        if not series:
+            return None
+
+        if end is None:
+            end = datetime.now(timezone.utc).timestamp()
+        start = end - window if window is not None else None
+
+        total = 0.0
+        count = 0
+        for _, value in series.samples(start, end):
+            total += value
+            count += 1
+
+        return total / count if count else None
+
+    def top(
+        self,
+        prefix: str,
+        fields: tuple[str, ...],
+        count: int = 10,
+        window: Optional[float] = None,
+        end: Optional[float] = None,
+    ) -> list[tuple[str, float]]:
+        """Get the entries with the highest average over the window.
+
+        Metrics are named `<prefix><entry>.<field>` and the value of an
+        entry is the sum of the averages of its `fields`. A heap of
+        `count` entries is kept, so the table is never sorted in full."""
+
+        if end is None:
+            end = datetime.now(timezone.utc).timestamp()
+
+        values: dict[str, float] = {}
+        for metric in self._series:
+            if not metric.startswith(prefix):
+                continue
+            entry, _, field = metric[len(prefix) :].rpartition(".")
+            if field not in fields:
+                continue
+            average = self.average(metric, window, end)
+            if average is not None:
+                values[entry] = values.get(entry, 0.0) + average
+
+        return heapq.nlargest(
+            count, values.items(), key=lambda item: item[1]
+        )
@@ -0,0 +1,307 @@
+"""AiMesh topology module.
+
+The AiMesh network is a tree: the main router, the nodes connected
+to it (directly or through other nodes) and the clients connected
+to each of the devices. The tree is updated incrementally from the
+AiMesh and clients data, and the path and subtree queries are cached
+until the part of the tree they depend on changes."""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Optional
+
+from asusrouter.modules.aimesh import AiMeshDevice
+from asusrouter.modules.client import AsusClient
+from asusrouter.modules.connection import ConnectionState
+
+DEFAULT_TOPOLOGY_HISTORY = 256
+
+
+class TopologyRole(str, Enum):
+    """Topology role enum."""
+
+    ROUTER = "router"
+    NODE = "node"
+    CLIENT = "client"
+
+
+@dataclass
+class TopologyChange:
+    """Topology change class.
+
+    `parent_old` is None for a new device and `parent_new` is None
+    for a removed one."""
+
+    version: int
+    mac: str
+    role: TopologyRole
+    parent_old: Optional[str] = None
+    parent_new: Optional[str] = None
+
+
+class AiMeshTopology:
+    """AiMesh topology class."""
+
+    def __init__(self, history: int = DEFAULT_TOPOLOGY_HISTORY) -> None:
+        """Initialize the topology."""
+
+        self._parent: dict[str, Optional[str]] = {}
+        self._children: dict[Optional[str], set[str]] = {}
+        self._role: dict[str, TopologyRole] = {}
+        self._root: Optional[str] = None
+
+        # Cached queries
+        self._paths: dict[str, tuple[str, ...]] = {}
+        self._subtrees: dict[str, frozenset[str]] = {}
+
+        # Change feed
+        self._changes: deque[TopologyChange] = deque(maxlen=history)
+        self.version = 0
+
+    # ---------------------------
+    # Update-related methods -->
+    # ---------------------------
+
+    def _ancestors(self, mac: Optional[str]) -> list[str]:
+        """Get the device and its ancestors, closest first."""
+
+        ancestors: list[str] = []
+        while mac is not None and mac not in ancestors:
+            ancestors.append(mac)
+            mac = self._parent.get(mac)
+        return ancestors
+
+    def _invalidate(self, mac: str) -> None:
+        """Drop the cached queries which depend on the device position."""
+
+        # Subtrees of all the ancestors include this device
+        for ancestor in self._ancestors(self._parent.get(mac)):
+            self._subtrees.pop(ancestor, None)
+
+        # Paths of the whole subtree go through this device
+        stack = [mac]
+        seen: set[str] = set()
+        while stack:
+            current = stack.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            self._paths.pop(current, None)
+            stack.extend(self._children.get(current, ()))
+
+    def _record(
+        self,
+        mac: str,
+        role: TopologyRole,
+        parent_old: Optional[str],
+        parent_new: Optional[str],
+    ) -> None:
+        """Record a change in the feed."""
+
+        self.version += 1
+        self._changes.append(
+            TopologyChange(self.version, mac, role, parent_old, parent_new)
+        )
+
+    def _attach(
+        self, mac: str, parent: Optional[str], role: TopologyRole
+    ) -> None:
+        """Attach the device to the parent."""
+
+        # A device cannot be its own ancestor
+        if parent is not None and mac in self._ancestors(parent):
+            parent = None
+
+        known = mac in self._parent
+        parent_old = self._parent.get(mac)
+        if known and parent_old == parent and self._role[mac] == role:
+            return
+
+        if known:
+            self._invalidate(mac)
+            self._children.get(parent_old, set()).discard(mac)
+
+        self._parent[mac] = parent
+        self._role[mac] = role
+        self._children.setdefault(parent, set()).add(mac)
+        self._invalidate(mac)
+
+        self._record(mac, role, parent_old, parent)
+
+    def _detach(self, mac: str) -> None:
+        """Remove the device from the topology."""
+
+        if mac not in self._parent:
+            return
+
+        # The devices connected to it are left without a parent
+        for child in list(self._children.get(mac, ())):
+            self._attach(child, None, self._role[child])
+
+        self._invalidate(mac)
+        parent = self._parent.pop(mac)
+        role = self._role.pop(mac)
+        self._children.get(parent, set()).discard(mac)
+        self._children.pop(mac, None)
+
+        self._record(mac, role, parent, None)
+
+    def update_nodes(self, nodes: dict[str, AiMeshDevice]) -> None:
+        """Update the topology with the AiMesh nodes."""
+
+        # Parents are referenced by the MAC address of their access points
+        owners: dict[str, str] = {}
+        root: Optional[str] = None
+        for mac, node in nodes.items():
+            owners[mac] = mac
+            for ap_mac in (node.ap or {}).values():
+                if isinstance(ap_mac, str):
+                    owners[ap_mac] = mac
+            if node.type == "router":
+                root = mac
+        self._root = root
+
+        # Nodes no longer in the list
+        for mac, role in list(self._role.items()):
+            if role != TopologyRole.CLIENT and mac not in nodes:
+                self._detach(mac)
+
+        # The router goes first, so that the nodes are attached to it
+        for mac in sorted(nodes, key=lambda mac: mac != root):
+            if mac == root:
+                self._attach(mac, None, TopologyRole.ROUTER)
+                continue
+            # Nodes with wired backhaul don't report a parent
+            parent = owners.get((nodes[mac].parent or {}).get("mac"), root)
+            self._attach(mac, parent, TopologyRole.NODE)
+
+    def update_clients(self, clients: dict[str, AsusClient]) -> None:
+        """Update the topology with the clients."""
+
+        online: set[str] = set()
+        for mac, client in clients.items():
+            connection = client.connection
+            if (
+                connection is None
+                or client.state != ConnectionState.CONNECTED
+                or self._role.get(mac, TopologyRole.CLIENT)
+                != TopologyRole.CLIENT
+            ):
+                continue
+            online.add(mac)
+            self._attach(
+                mac, connection.node or self._root, TopologyRole.CLIENT
+            )
+
+        # Clients no longer connected
+        for mac, role in list(self._role.items()):
+            if role == TopologyRole.CLIENT and mac not in online:
+                self._detach(mac)
+
+    # ---------------------------
+    # <-- Update-related methods
+    # ---------------------------
+
+    # ---------------------------
+    # Query-related methods -->
+    # ---------------------------
+
+    def role(self, mac: str) -> Optional[TopologyRole]:
+        """Get the role of the device."""
+
+        return self._role.get(mac)
+
+    def parent(self, mac: str) -> Optional[str]:
+        """Get the device the given one is connected to."""
+
+        return self._parent.get(mac)
+
+    def path(self, mac: str) -> tuple[str, ...]:
+        """Get the path from the top of the tree down to the device."""
+
+        if mac not in self._parent:
+            return ()
+
+        path = self._paths.get(mac)
+        if path is None:
+            parent = self._parent[mac]
+            # Reuse the path of the parent if available
+            if parent in self._paths:
+                path = self._paths[parent] + (mac,)
+            else:
+                path = tuple(reversed(self._ancestors(mac)))
+            self._paths[mac] = path
+
+        return path
+
+    def subtree(
+        self, mac: str, role: Optional[TopologyRole] = None
+    ) -> frozenset[str]:
+        """Get all the devices connected to the device, directly or not.
+
+        These are the devices which lose connection if the device goes
+        down. With `role`, only devices with this role are returned."""
+
+        if mac not in self._parent:
+            return frozenset()
+
+        subtree = self._subtrees.get(mac)
+        if subtree is None:
+            found: set[str] = set()
+            stack = list(self._children.get(mac, ()))
+            while stack:
+                current = stack.pop()
+                if current in found or current == mac:
+                    continue
+                found.add(current)
+                stack.extend(self._children.get(current, ()))
+            subtree = frozenset(found)
+            self._subtrees[mac] = subtree
+
+        if role is None:
+            return subtree
+        return frozenset(
+            device for device in subtree if self._role[device] == role
+        )
+
+    def changes(self, since: int = 0) -> list[TopologyChange]:
+        """Get the changes after the given version.
+
+        Only the most recent changes are kept. Compare the version
+        of the first change with `since` to find out if any are missing."""
+
+        if since >= self.version:
+            return []
+        return [change for change in self._changes if change.version > since]
+
+    def as_dict(self, mac: Optional[str] = None) -> dict[str, Any]:
+        """Get the tree (or the part under the device) as nested dicts."""
+
+        def _branch(device: str, seen: set[str]) -> dict[str, Any]:
+            seen.add(device)
+            return {
+                "role": self._role[device].value,
+                "children": {
+                    child: _branch(child, seen)
+                    for child in sorted(self._children.get(device, ()))
+                    if child not in seen
+                },
+            }
+
+        seen: set[str] = set()
+        if mac is not None:
+            if mac not in self._parent:
+                return {}
+            return {mac: _branch(mac, seen)}
+
+        return {
+            device: _branch(device, seen)
+            for device in sorted(self._children.get(None, ()))
+        }
+
+    # ---------------------------
+    # <-- Query-related methods
+    # ---------------------------
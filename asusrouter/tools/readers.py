@@ -27,47 +27,73 @@ RANDOM_SYMBOLS: list[str] = [
     "\u0009",
 ]
 
+MAC_PATTERN = re.compile("^([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})$")
+
 
 def merge_dicts(
     data: dict[Any, Any], merge_data: dict[Any, Any]
 ) -> dict[Any, Any]:
     """This methods merges two nested dicts into a single one
-    while keeping all the existing values"""
-
-    # Create a new dictionary to store the merged data
-    merged_data = data.copy()
-
-    # Go through the merge data and fill the merged data
-    for key, value in merge_data.items():
-        # Check if the value is a dict
-        if isinstance(value, dict):
-            # Check if the key is in the merged data
-            if key not in merged_data or merged_data[key] is None:
-                # Add the key to the merged data
-                merged_data[key] = {}
-            # Merge the dicts
-            merged_data[key] = merge_dicts(merged_data[key], value)
-            # Continue to the next value
-            continue
-        # Check if the key is in the merged data
-        if key not in merged_data:
-            # Add the key to the merged data
-            merged_data[key] = value
-        else:
-            # If the key is already in the merged data, compare the values
-            if merged_data[key] is None:
-                # If the value in the merged data is None, take the value from the merge data
+    while keeping all the existing values.
+
+    Neither of the input dicts is modified. For the hot paths, where
+    the input is not needed anymore, use `merge_dicts_inplace`."""
+
+    return _merge_dicts(data.copy(), merge_data, copy=True)
+
+
+def merge_dicts_inplace(
+    data: dict[Any, Any], merge_data: dict[Any, Any]
+) -> dict[Any, Any]:
+    """Merge `merge_data` into `data` in place and return `data`.
+
+    The values are merged the same way as with `merge_dicts`: the first
+    non-None value wins. Nested dicts of `merge_data`, which are not
+    in `data` yet, are taken over as they are without copying, so
+    `merge_data` should not be used after the merge."""
+
+    return _merge_dicts(data, merge_data, copy=False)
+
+
+def _merge_dicts(
+    data: dict[Any, Any], merge_data: dict[Any, Any], copy: bool
+) -> dict[Any, Any]:
+    """Merge nested dicts iteratively.
+
+    With `copy` set, every nested dict on the merge path is copied,
+    so that the original dicts stay intact."""
+
+    # Pairs of (merged dict, dict to merge into it)
+    stack = [(data, merge_data)]
+
+    while stack:
+        merged_data, to_merge = stack.pop()
+        for key, value in to_merge.items():
+            # Missing values and None values are both replaced
+            existing = merged_data.get(key)
+
+            # Nested dict
+            if isinstance(value, dict):
+                if existing is None:
+                    if not copy:
+                        merged_data[key] = value
+                        continue
+                    existing = {}
+                elif not isinstance(existing, dict):
+                    # Keep the existing value
+                    continue
+                elif copy:
+                    existing = existing.copy()
+                merged_data[key] = existing
+                stack.append((existing, value))
+                continue
+
+            # If both values are not None, keep the value from the merged data
+            if existing is None:
                 merged_data[key] = value
-            elif value is None:
-                # If the value in the merge data is not None
-                # and the value in the merge data is None, keep the value in the merged data
-                pass
-            else:
-                # If both values are not None, keep the value from the merged data
-                pass
 
     # Return the merged data
-    return merged_data
+    return data
 
 
 def read_as_snake_case(data: str) -> str:
@@ -169,9 +195,7 @@ def readable_mac(raw: Optional[str]) -> bool:
     """Checks if string is MAC address"""
 
     if isinstance(raw, str):
-        if re.search(
-            re.compile("^([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})$"), raw
-        ):
+        if MAC_PATTERN.match(raw):
             return True
 
     return False
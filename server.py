@@ -1,6 +1,8 @@
 import aiohttp
 import asyncio
 from asusrouter import AsusRouter, AsusData
+from asusrouter.connection import Connection # For probing the router
+from asusrouter.error import AsusRouterServiceError, AsusRouterTimeoutError
 from asusrouter.modules.state import AsusState
 from asusrouter.modules.system import AsusSystem # For system service calls
 from asusrouter.modules.endpoint import EndpointTools # For ping
@@ -13,12 +15,36 @@ from asusrouter.modules.openvpn import AsusOVPNClient, AsusOVPNServer
 from asusrouter.modules.wireguard import AsusWireGuardClient, AsusWireGuardServer
 from asusrouter.modules.vpnc import AsusVPNC
 from asusrouter.modules.wlan import AsusWLAN, Wlan
+from asusrouter.modules.topology import TopologyRole # For get_aimesh_topology
+from asusrouter.modules.connection import ConnectionState # For get_router_overview
 
 
 from mcp.server.fastmcp import FastMCP
-from typing import Dict, Any, Tuple, List, Optional
+from mcp.types import CallToolResult, TextContent
+import pydantic_core
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Annotated, AsyncIterator, Awaitable, Dict, Any, Callable, Tuple, List, Optional
 
-mcp = FastMCP("Asus Router MCP Server", dependencies=["aiohttp", "asusrouter"])
+@asynccontextmanager
+async def _lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Stop the background tasks when the server shuts down"""
+    try:
+        yield
+    finally:
+        for task in (_clients_sampler, _resource_refresh):
+            if task is not None and not task.done():
+                task.cancel()
+
+mcp = FastMCP(
+    "Asus Router MCP Server",
+    dependencies=["aiohttp", "asusrouter"],
+    lifespan=_lifespan,
+)
 
 # Router configuration
 ROUTER_CONFIG = {
@@ -28,21 +54,301 @@ ROUTER_CONFIG = {
     "use_ssl": False
 }
 
+# Number of samples kept per metric (CPU, network, client throughput, ...)
+# by the shared router
+HISTORY_SIZE = 3600
+
 # Helper function to create router connection
-async def create_router_connection() -> Tuple[AsusRouter, aiohttp.ClientSession]:
+async def create_router_connection(
+    history_size: Optional[int] = None,
+) -> Tuple[AsusRouter, aiohttp.ClientSession]:
     session = aiohttp.ClientSession()   
     router = AsusRouter(
         hostname=ROUTER_CONFIG["hostname"],
         username=ROUTER_CONFIG["username"],
         password=ROUTER_CONFIG["password"],
         use_ssl=ROUTER_CONFIG["use_ssl"],
-        session=session
+        session=session,
+        history_size=history_size
     )
-    await router.async_connect()
+    try:
+        await router.async_connect()
+    except Exception:
+        await session.close()
+        raise
     return router, session
 
+# --- Response shaping ---
+# Large responses can be reduced with the same arguments in any tool supporting them:
+# fields (dotted paths to keep), where (dotted path -> value to match),
+# limit (entries per page) and cursor (`next_cursor` from the previous page).
+# The entries are selected before the response is serialized.
+
+def _plain(value: Any) -> Any:
+    """Get the plain value of an enum"""
+    return value.value if isinstance(value, Enum) else value
+
+def _get_path(value: Any, path: str) -> Any:
+    """Get the value by a dotted path through dicts and objects"""
+    for part in path.split("."):
+        if value is None:
+            return None
+        if isinstance(value, dict):
+            if part in value:
+                value = value[part]
+            else:
+                # Keys can be enums or numbers
+                value = next(
+                    (item for key, item in value.items() if str(_plain(key)) == part),
+                    None,
+                )
+        else:
+            value = getattr(value, part, None)
+    return value
+
+def _matches(entry: Any, where: Dict[str, Any]) -> bool:
+    """Check that the entry has all the values in `where`"""
+    for path, expected in where.items():
+        actual = _plain(_get_path(entry, path))
+        if actual != expected and str(actual) != str(expected):
+            return False
+    return True
+
+def shape_response(
+    name: str,
+    data: Any,
+    fields: Optional[List[str]] = None,
+    where: Optional[Dict[str, Any]] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Build the tool response with only the entries and fields requested"""
+    if fields is None and where is None and limit is None and cursor is None:
+        return {name: data}
+    if limit is not None and limit < 1:
+        return {"error": f"Invalid limit {limit}: must be at least 1"}
+    if isinstance(data, dict):
+        entries = list(data.items())
+    elif isinstance(data, (list, tuple)):
+        entries = list(enumerate(data))
+        # Lists are paged by index
+        if cursor is not None:
+            try:
+                cursor_index = int(cursor)
+            except ValueError:
+                return {"error": f"Invalid cursor {cursor!r}: expected a list index"}
+    else:
+        return {name: data}
+
+    if where:
+        entries = [(key, entry) for key, entry in entries if _matches(entry, where)]
+    total = len(entries)
+
+    # Pages are ordered by key (index for lists), so that the cursor
+    # stays valid when entries change between the calls
+    if isinstance(data, dict):
+        entries.sort(key=lambda item: str(_plain(item[0])))
+        if cursor is not None:
+            entries = [item for item in entries if str(_plain(item[0])) > cursor]
+    elif cursor is not None:
+        entries = [item for item in entries if item[0] > cursor_index]
+    next_cursor = None
+    if limit is not None and len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = str(_plain(entries[-1][0]))
+
+    if fields:
+        entries = [
+            (key, {path: _get_path(entry, path) for path in fields})
+            for key, entry in entries
+        ]
+    items: Any = (
+        dict(entries) if isinstance(data, dict) else [entry for _, entry in entries]
+    )
+    return {name: items, "total": total, "next_cursor": next_cursor}
+
+# --- Response encoding ---
+# Responses built from the shared router state are encoded to JSON once per
+# state version and projection, and reused until the state changes
+
+# Number of encoded responses kept
+JSON_CACHE_SIZE = 64
+
+_json_cache: "OrderedDict[Tuple[AsusData, int, str], Tuple[str, Any]]" = OrderedDict()
+
+def encode_json(value: Any) -> Tuple[str, Any]:
+    """Encode the response (dataclasses, enums, datetimes, ...) to the JSON text
+    and the plain JSON-compatible value used as the structured content"""
+    plain = pydantic_core.to_jsonable_python(value, fallback=str)
+    return pydantic_core.to_json(plain, indent=2).decode(), plain
+
+def encode_state(
+    datatype: AsusData, version: int, projection: Any, build: Callable[[], Any]
+) -> Tuple[str, Any]:
+    """Get the encoded response for the state version, building it only once"""
+    key = (datatype, version, pydantic_core.to_json(projection, fallback=str).decode())
+    encoded = _json_cache.get(key)
+    if encoded is None:
+        encoded = _json_cache[key] = encode_json(build())
+        if len(_json_cache) > JSON_CACHE_SIZE:
+            _json_cache.popitem(last=False)
+    else:
+        _json_cache.move_to_end(key)
+    return encoded
+
+def json_result(encoded: Tuple[str, Any]) -> CallToolResult:
+    """Build the tool result from the encoded response"""
+    text, plain = encoded
+    return CallToolResult(
+        content=[TextContent(type="text", text=text)],
+        # Same as FastMCP wraps the dict results
+        structuredContent={"result": plain},
+    )
+
+# Shared connection kept open for the resources, so that they are served
+# from the library cache and the changes can be pushed to the subscribers
+_shared_router: Optional[AsusRouter] = None
+_shared_session: Optional[aiohttp.ClientSession] = None
+_shared_lock = asyncio.Lock()
+
+async def get_shared_router() -> AsusRouter:
+    """Get the shared router connection, connecting on the first call"""
+    global _shared_router, _shared_session
+    async with _shared_lock:
+        if _shared_router is None:
+            _shared_router, _shared_session = await create_router_connection(
+                history_size=HISTORY_SIZE
+            )
+        return _shared_router
+
+# Router state exposed as MCP resources
+STATE_RESOURCES: Dict[str, AsusData] = {
+    "clients": AsusData.CLIENTS,
+    "wan": AsusData.WAN,
+    "network": AsusData.NETWORK,
+    "system": AsusData.SYSINFO,
+    "aimesh": AsusData.AIMESH,
+}
+# How often the subscribed resources are fetched from the router (seconds)
+RESOURCE_REFRESH_INTERVAL = 10
+
+# Sessions subscribed to each resource and the last changes found
+_resource_sessions: Dict[str, set] = {}
+_resource_unsubscribe: Dict[str, Any] = {}
+_resource_changes: Dict[str, Dict[str, Any]] = {}
+_resource_refresh: Optional[asyncio.Task] = None
+
+def _register_state_resource(name: str, datatype: AsusData) -> None:
+    """Register the resource for the router state and its last changes"""
+
+    @mcp.resource(
+        f"asusrouter://state/{name}",
+        name=f"state_{name}",
+        description=f"Current {name} state of the router (subscribe to get updates)",
+        mime_type="application/json",
+    )
+    async def read_state() -> str:
+        router = await get_shared_router()
+        state = await router.async_get_changes(datatype)
+        return encode_state(
+            datatype, state.version, "resource", lambda: {name: state.data}
+        )[0]
+
+    @mcp.resource(
+        f"asusrouter://changes/{name}",
+        name=f"changes_{name}",
+        description=f"Last change of the {name} state: added, removed and changed keys",
+        mime_type="application/json",
+    )
+    async def read_changes() -> Dict[str, Any]:
+        return _resource_changes.get(name, {})
+
+for _name, _datatype in STATE_RESOURCES.items():
+    _register_state_resource(_name, _datatype)
+
+def _diff_to_dict(diff: Any) -> Dict[str, Any]:
+    """Convert the data difference to the response format"""
+    return {
+        "added": diff.added,
+        "removed": list(diff.removed),
+        "changed": {key: new for key, (_, new) in diff.changed.items()},
+    }
+
+async def _on_state_change(name: str, datatype: AsusData, diff: Any) -> None:
+    """Save the changes and notify the subscribed sessions"""
+    _resource_changes[name] = _diff_to_dict(diff)
+    for uri in (f"asusrouter://state/{name}", f"asusrouter://changes/{name}"):
+        for session in list(_resource_sessions.get(uri, ())):
+            try:
+                await session.send_resource_updated(uri)
+            except Exception:
+                # The session is gone
+                _resource_sessions[uri].discard(session)
+
+async def _refresh_resources() -> None:
+    """Fetch the subscribed state, so that the changes are found and pushed"""
+    while _resource_unsubscribe:
+        router = await get_shared_router()
+        for name in list(_resource_unsubscribe):
+            try:
+                await router.async_get_data(STATE_RESOURCES[name])
+            except Exception:
+                # Try again on the next round
+                pass
+        await asyncio.sleep(RESOURCE_REFRESH_INTERVAL)
+
+def _resource_name(uri: Any) -> Optional[str]:
+    """Get the state name from the resource URI"""
+    for prefix in ("asusrouter://state/", "asusrouter://changes/"):
+        if str(uri).startswith(prefix):
+            name = str(uri)[len(prefix):]
+            return name if name in STATE_RESOURCES else None
+    return None
+
+@mcp._mcp_server.subscribe_resource()
+async def subscribe_resource(uri: Any) -> None:
+    """Start pushing the updates of the resource to the session"""
+    global _resource_refresh
+    name = _resource_name(uri)
+    if name is None:
+        return
+    session = mcp._mcp_server.request_context.session
+    _resource_sessions.setdefault(str(uri), set()).add(session)
+    # One library subscription and one fetch per state for all the sessions
+    if name not in _resource_unsubscribe:
+        router = await get_shared_router()
+        _resource_unsubscribe[name] = router.subscribe(
+            STATE_RESOURCES[name],
+            lambda datatype, diff: _on_state_change(name, datatype, diff),
+        )
+    if _resource_refresh is None or _resource_refresh.done():
+        _resource_refresh = asyncio.create_task(_refresh_resources())
+
+@mcp._mcp_server.unsubscribe_resource()
+async def unsubscribe_resource(uri: Any) -> None:
+    """Stop pushing the updates of the resource to the session"""
+    name = _resource_name(uri)
+    if name is None:
+        return
+    session = mcp._mcp_server.request_context.session
+    _resource_sessions.get(str(uri), set()).discard(session)
+    # Stop watching the state if nobody is subscribed anymore
+    if not any(
+        _resource_sessions.get(f"asusrouter://{kind}/{name}")
+        for kind in ("state", "changes")
+    ):
+        unsubscribe = _resource_unsubscribe.pop(name, None)
+        if unsubscribe:
+            unsubscribe()
+
 @mcp.tool()
-async def get_connected_devices() -> Dict[str, Any]:
+async def get_connected_devices(
+    since_version: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+    where: Optional[Dict[str, Any]] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Annotated[CallToolResult, Dict[str, Any]]:
     """Fetch all connected devices from the ASUS Router
     
     Retrieves detailed information about each device connected to the router, including:
@@ -55,23 +361,220 @@ async def get_connected_devices() -> Dict[str, Any]:
     - Time since connection was established
     - Vendor information when available
     
+    The response includes a `version` of the devices list. Pass it as `since_version`
+    in the next call to get only what has changed since then:
+    - `not_modified: true` if nothing has changed
+    - `changes` with added devices, removed MAC addresses and changed devices
+    - the full `devices` list if the changes since that version are no longer known
+    
+    Args:
+        since_version: Optional version from a previous call to get only the changes
+        fields: Optional list of dotted paths to return for each entry (e.g., ["connection.ip_address"])
+        where: Optional filter, dotted path -> value each entry must match (e.g., {"state": 1})
+        limit: Optional maximum number of entries to return
+        cursor: Optional `next_cursor` from the previous response to get the next page
+    
     Returns:
-        Dict[str, Any]: A dictionary where keys are device MAC addresses and values contain
-                        the connection details for each device
+        Dict[str, Any]: The version and a dictionary where keys are device MAC addresses
+                        and values contain the connection details for each device,
+                        or only the changes since `since_version`
     """
     try:
-        router, session = await create_router_connection()
+        router = await get_shared_router()
+        changes = await router.async_get_changes(AsusData.CLIENTS, since_version)
+    except Exception as e:
+        return json_result(encode_json({"error": str(e)}))
+
+    def build() -> Dict[str, Any]:
+        if not changes.modified:
+            return {"version": changes.version, "not_modified": True}
+        if changes.diff is not None:
+            diff = _diff_to_dict(changes.diff)
+            # Only the fields requested for the added and changed devices
+            for kind in ("added", "changed"):
+                diff[kind] = shape_response(kind, diff[kind], fields, where)[kind]
+            return {"version": changes.version, "changes": diff}
+        if changes.data is None:
+            return {"message": "No connected devices data available"}
+        shaped = shape_response("devices", changes.data, fields, where, limit, cursor)
+        if "error" in shaped:
+            return shaped
+        return {"version": changes.version, **shaped}
+
+    # The full list is the same for any `since_version` it is returned for
+    base = since_version if changes.diff is not None or not changes.modified else None
+    try:
+        return json_result(
+            encode_state(
+                AsusData.CLIENTS,
+                changes.version,
+                [base, fields, where, limit, cursor],
+                build,
+            )
+        )
+    except Exception as e:
+        return json_result(encode_json({"error": str(e)}))
+
+# How often the clients are fetched to fill the throughput history (seconds)
+CLIENTS_SAMPLE_INTERVAL = 10
+
+_clients_sampler: Optional[asyncio.Task] = None
+# Sampling stops once nobody asked for the top clients within their window
+_clients_sampling_until: Optional[datetime] = None
+
+async def _sample_clients() -> None:
+    """Fetch the clients regularly, so that the history has samples to average"""
+    while datetime.now(timezone.utc) < _clients_sampling_until:
+        await asyncio.sleep(CLIENTS_SAMPLE_INTERVAL)
         try:
-            data = await router.async_get_data(AsusData.CLIENTS)
-            if data is None:
-                return {"message": "No connected devices data available"}
-            return {"devices": data}
-        finally:
-            await router.async_disconnect()
-            await session.close()
+            router = await get_shared_router()
+            await router.async_get_data(AsusData.CLIENTS)
+        except Exception:
+            # Try again on the next round
+            pass
+
+@mcp.tool()
+async def get_top_clients(count: int = 10, minutes: float = 5) -> Dict[str, Any]:
+    """Get the clients with the highest throughput (top talkers)
+    
+    Ranks wireless clients by their RX + TX speed, using the throughput history
+    of the shared connection. The first call starts sampling the clients every
+    `CLIENTS_SAMPLE_INTERVAL` seconds, so the ranking only covers the samples
+    collected since then: right after the first call it is based on the current
+    speeds, later on the average over the last `minutes`. Sampling stops when
+    the tool has not been called for `minutes`. Only the requested number of
+    clients is ranked, the whole client table is not sorted.
+    
+    Args:
+        count: Number of clients to return (default: 10)
+        minutes: Period to average the throughput over, once sampled (default: 5)
+    
+    Returns:
+        Dict[str, Any]: A list of clients with MAC address, name and throughput in Mbit/s,
+                        the highest first
+    """
+    global _clients_sampler, _clients_sampling_until
+    try:
+        router = await get_shared_router()
+        clients = await router.async_get_data(AsusData.CLIENTS)
+        # Keep sampling for the window of this call
+        until = datetime.now(timezone.utc) + timedelta(minutes=minutes)
+        if _clients_sampling_until is None or until > _clients_sampling_until:
+            _clients_sampling_until = until
+        if _clients_sampler is None or _clients_sampler.done():
+            _clients_sampler = asyncio.create_task(_sample_clients())
+        top = router.top_clients(count, minutes * 60)
+        result = []
+        for mac, throughput in top:
+            client = clients.get(mac) if isinstance(clients, dict) else None
+            description = getattr(client, "description", None)
+            result.append({
+                "mac": mac,
+                "name": getattr(description, "name", None),
+                "throughput": round(throughput, 2),
+            })
+        return {"top_clients": result}
     except Exception as e:
         return {"error": str(e)}
 
+# Data gathered by get_router_overview by default
+OVERVIEW_DATATYPES = [
+    AsusData.SYSINFO,
+    AsusData.CPU,
+    AsusData.RAM,
+    AsusData.TEMPERATURE,
+    AsusData.WAN,
+    AsusData.NETWORK,
+    AsusData.CLIENTS,
+]
+
+def _summary_clients(data: Any) -> Dict[str, Any]:
+    """Count the connected devices"""
+    clients = data.values() if isinstance(data, dict) else []
+    connected = [
+        client for client in clients
+        if getattr(client, "state", None) == ConnectionState.CONNECTED
+    ]
+    return {"connected": len(connected), "known": len(data or {})}
+
+def _summary_cpu(data: Any) -> Dict[str, Any]:
+    """Get the total CPU usage"""
+    total = data.get("total", {}) if isinstance(data, dict) else {}
+    return {"usage": total.get("usage"), "cores": len(data or {}) - 1}
+
+def _summary_network(data: Any) -> Dict[str, Any]:
+    """Get the current speed per interface"""
+    if not isinstance(data, dict):
+        return {}
+    return {
+        interface: {key: values.get(key) for key in ("rx_speed", "tx_speed")}
+        for interface, values in data.items()
+        if isinstance(values, dict)
+    }
+
+def _summary_ram(data: Any) -> Dict[str, Any]:
+    """Get the RAM usage"""
+    if not isinstance(data, dict):
+        return {}
+    return {key: data.get(key) for key in ("usage", "used", "total")}
+
+def _summary_wan(data: Any) -> Any:
+    """Get the internet connection state"""
+    return data.get("internet", data) if isinstance(data, dict) else data
+
+# Compact forms of the data, the rest is returned as is
+OVERVIEW_SUMMARIES: Dict[AsusData, Callable[[Any], Any]] = {
+    AsusData.CLIENTS: _summary_clients,
+    AsusData.CPU: _summary_cpu,
+    AsusData.NETWORK: _summary_network,
+    AsusData.RAM: _summary_ram,
+    AsusData.WAN: _summary_wan,
+}
+
+@mcp.tool()
+async def get_router_overview(datatypes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Get a compact overview of the router status in one call
+    
+    Gathers the system information, CPU and RAM usage, temperature, WAN state,
+    interface speeds and the number of connected devices at once. The data is
+    fetched concurrently over the shared connection, and the data available from
+    the same router endpoint is requested together, so the whole view takes only
+    a few router requests. Use the specific tools for the full details.
+    
+    Args:
+        datatypes: Optional list of data to gather instead of the default set
+                   (e.g., ["cpu", "ram", "wan"]). Any `AsusData` value is accepted.
+    
+    Returns:
+        Dict[str, Any]: The summary per data type and its freshness: when the data
+                        was received from the router and its age in seconds
+    """
+    try:
+        selected = (
+            [AsusData(name) for name in datatypes] if datatypes else OVERVIEW_DATATYPES
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+
+    try:
+        router = await get_shared_router()
+        data = await router.async_get_data_many(selected)
+    except Exception as e:
+        return {"error": str(e)}
+
+    now = datetime.now(timezone.utc)
+    overview: Dict[str, Any] = {}
+    freshness: Dict[str, Any] = {}
+    for datatype, value in data.items():
+        summary = OVERVIEW_SUMMARIES.get(datatype)
+        overview[datatype.value] = summary(value) if summary else value
+        timestamp = router.data_timestamp(datatype)
+        freshness[datatype.value] = {
+            "timestamp": timestamp.isoformat() if timestamp else None,
+            "age": round((now - timestamp).total_seconds(), 1) if timestamp else None,
+        }
+    return {"overview": overview, "freshness": freshness}
+
 @mcp.tool()
 async def reboot_router() -> Dict[str, Any]:
     """
@@ -83,6 +586,7 @@ async def reboot_router() -> Dict[str, Any]:
     - Any disconnected devices will need to reconnect after reboot
     
     Note: The router will be offline for 1-2 minutes during the reboot.
+    Use `start_job` with kind `reboot` to know when it is back online.
     
     Returns:
         Dict[str, Any]: A status message confirming the reboot command was sent
@@ -102,7 +606,12 @@ async def reboot_router() -> Dict[str, Any]:
         return {"error": f"Error rebooting router: {str(e)}"}
     
 @mcp.tool()
-async def get_wlan_status() -> Dict[str, Any]:
+async def get_wlan_status(
+    fields: Optional[List[str]] = None,
+    where: Optional[Dict[str, Any]] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
     """Get detailed wireless network configuration for all supported bands
     
     Retrieves comprehensive settings for all wireless networks (2.4GHz, 5GHz, 5GHz-2, 6GHz if supported), including:
@@ -114,6 +623,12 @@ async def get_wlan_status() -> Dict[str, Any]:
     - Visibility settings (hidden networks)
     - Band-specific configuration details
     
+    Args:
+        fields: Optional list of dotted paths to return for each entry
+        where: Optional filter, dotted path -> value each entry must match
+        limit: Optional maximum number of entries to return
+        cursor: Optional `next_cursor` from the previous response to get the next page
+    
     Returns:
         Dict[str, Any]: A dictionary with nested entries for each supported band
                         containing all wireless settings
@@ -124,7 +639,7 @@ async def get_wlan_status() -> Dict[str, Any]:
             data = await router.async_get_data(AsusData.WLAN)
             if data is None:
                 return {"message": "No WLAN data available"}
-            return {"wlan": data}
+            return shape_response("wlan", data, fields, where, limit, cursor)
         finally:
             await router.async_disconnect()
             await session.close()
@@ -132,7 +647,12 @@ async def get_wlan_status() -> Dict[str, Any]:
         return {"error": str(e)}
 
 @mcp.tool()
-async def get_network_status() -> Dict[str, Any]:
+async def get_network_status(
+    fields: Optional[List[str]] = None,
+    where: Optional[Dict[str, Any]] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
     """
     Retrieve traffic statistics for all network interfaces
     
@@ -144,6 +664,12 @@ async def get_network_status() -> Dict[str, Any]:
     This tool helps monitor network utilization and can identify which interfaces
     are experiencing the most traffic.
     
+    Args:
+        fields: Optional list of dotted paths to return for each entry
+        where: Optional filter, dotted path -> value each entry must match
+        limit: Optional maximum number of entries to return
+        cursor: Optional `next_cursor` from the previous response to get the next page
+    
     Returns:
         Dict[str, Any]: A dictionary with separate entries for each network interface type
                         containing their respective traffic statistics
@@ -154,7 +680,7 @@ async def get_network_status() -> Dict[str, Any]:
             data = await router.async_get_data(AsusData.NETWORK)
             if data is None:
                 return {"message": "No network data available"}
-            return {"network": data}
+            return shape_response("network", data, fields, where, limit, cursor)
         finally:
             await router.async_disconnect()
             await session.close()
@@ -221,6 +747,48 @@ async def get_aimesh_info() -> Dict[str, Any]:
     except Exception as e:
         return {"error": str(e)}
 
+@mcp.tool()
+async def get_aimesh_topology(mac: Optional[str] = None) -> Dict[str, Any]:
+    """Get the AiMesh network tree: router, nodes and the clients behind them
+    
+    Without a MAC address, returns the whole tree as nested dictionaries.
+    With a MAC address of a node or a client, answers topology questions for it:
+    - Role of the device (router, node, client)
+    - Device it is connected to (parent)
+    - Backhaul path from the main router down to the device
+    - Devices behind it, i.e. the ones losing connection if it goes down
+    - Clients behind it (directly or through other nodes)
+    
+    Args:
+        mac: Optional MAC address of a node or client (e.g., "AA:BB:CC:DD:EE:FF")
+    
+    Returns:
+        Dict[str, Any]: The topology tree or the details for the given device
+    """
+    try:
+        # The shared router keeps the topology updated between the calls
+        router = await get_shared_router()
+        # Nodes go first, so that clients can be attached to them
+        await router.async_get_data(AsusData.AIMESH)
+        await router.async_get_data(AsusData.CLIENTS)
+        topology = router.topology
+        if mac is None:
+            return {"topology": topology.as_dict()}
+        mac = mac.upper()
+        role = topology.role(mac)
+        if role is None:
+            return {"error": f"Device {mac} not found in the AiMesh network"}
+        return {
+            "mac": mac,
+            "role": role.value,
+            "parent": topology.parent(mac),
+            "path": list(topology.path(mac)),
+            "subtree": sorted(topology.subtree(mac)),
+            "clients": sorted(topology.subtree(mac, TopologyRole.CLIENT)),
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
 @mcp.tool()
 async def get_system_info() -> Dict[str, Any]:
     """Get comprehensive system information about the router hardware and software (SYSINFO)
@@ -502,7 +1070,7 @@ async def get_dsl_status() -> Dict[str, Any]:
         return {"error": str(e)}
 
 @mcp.tool()
-async def run_speedtest() -> Dict[str, Any]:
+async def run_speedtest(timeout: int = 120) -> Dict[str, Any]:
     """Run a network speed test from the router
     
     Initiates a speed test directly from the router to measure:
@@ -515,7 +1083,11 @@ async def run_speedtest() -> Dict[str, Any]:
     without needing to run tests from client devices.
     
     Note: The test may take 30-90 seconds to complete and could briefly impact
-    network performance during testing.
+    network performance during testing. Use `start_job` with kind `speedtest`
+    to run it in the background instead.
+    
+    Args:
+        timeout: Maximum time to wait for the test to finish in seconds (default: 120)
     
     Returns:
         Dict[str, Any]: A dictionary containing speed test results including
@@ -531,23 +1103,19 @@ async def run_speedtest() -> Dict[str, Any]:
             if router._identity and not router._identity.ookla:
                 return {"message": "Speedtest (Ookla) is not supported by this router model or firmware."}
 
-            # Initiate speedtest
-            # The service name for ookla speedtest might be specific, checking library details.
-            # AsusData.SPEEDTEST uses 'ookla_speedtest_get_result', to initiate, it might be 'ookla_speedtest' or similar
-            # From system.py, it seems there's no direct `AsusSystem` enum for this.
-            # From pyproject.toml & tests, it seems the `ookla_speedtest` service call is correct.
-            start_success = await router.async_run_service("ookla_speedtest", apply=True)
-            if not start_success:
+            # Run the test, the steps are checked until the result is reported
+            deadline = datetime.now(timezone.utc) + timedelta(seconds=timeout)
+            try:
+                async for _ in router.async_run_speedtest(deadline):
+                    pass
+            except AsusRouterServiceError:
                 return {"error": "Failed to initiate speed test."}
-            
-            # Wait for test to complete and get results
-            # This could take some time, so we'll wait and then fetch the result
-            # Giving it a bit more time.
-            await asyncio.sleep(75) 
-            
-            # Get the results
-            result = await router.async_get_data(AsusData.SPEEDTEST_RESULT, force=True) # Force to get fresh results
-            history = await router.async_get_data(AsusData.SPEEDTEST, force=True) # Get main speedtest data which includes status
+            except AsusRouterTimeoutError:
+                return {"message": f"Speed test initiated but not finished in {timeout} seconds. Results not available yet."}
+
+            # Get the results, already fetched with the last step
+            result = await router.async_get_data(AsusData.SPEEDTEST_RESULT)
+            history = await router.async_get_data(AsusData.SPEEDTEST) # Get main speedtest data which includes status
             
             if result is None and history and history.get("state") != 0: # 0 often means idle/finished
                  return {"message": f"Speed test initiated. Current status: {history.get('state')}. Results not available yet. Try fetching again in a moment."}
@@ -868,7 +1436,12 @@ async def get_ports_status() -> Dict[str, Any]:
         return {"error": str(e)}
 
 @mcp.tool()
-async def get_devicemap() -> Dict[str, Any]:
+async def get_devicemap(
+    fields: Optional[List[str]] = None,
+    where: Optional[Dict[str, Any]] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
     """Get comprehensive device map information (raw data)
     
     Retrieves raw, detailed device classification information from the router's devicemap.
@@ -882,6 +1455,12 @@ async def get_devicemap() -> Dict[str, Any]:
     This tool provides a low-level, comprehensive view of various router states.
     It's typically more detailed and less processed than other specific `get_` tools.
     
+    Args:
+        fields: Optional list of dotted paths to return for each entry
+        where: Optional filter, dotted path -> value each entry must match
+        limit: Optional maximum number of entries to return
+        cursor: Optional `next_cursor` from the previous response to get the next page
+    
     Returns:
         Dict[str, Any]: A detailed map of various router status points.
     """
@@ -891,7 +1470,7 @@ async def get_devicemap() -> Dict[str, Any]:
             data = await router.async_get_data(AsusData.DEVICEMAP)
             if data is None:
                 return {"message": "No devicemap data available"}
-            return {"devicemap": data}
+            return shape_response("devicemap", data, fields, where, limit, cursor)
         finally:
             await router.async_disconnect()
             await session.close()
@@ -955,13 +1534,20 @@ async def get_vpn_fusion_status() -> Dict[str, Any]:
         return {"error": str(e)}
 
 @mcp.tool()
-async def get_vpn_fusion_client_list_raw() -> Dict[str, Any]:
+async def get_vpn_fusion_client_list_raw(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
     """Get the raw VPN Fusion (VPNC) client list string.
     
     Retrieves the raw string representation of the VPN Fusion client list
     as stored by the router. This is an advanced tool for inspecting the
     exact configuration string.
     
+    Args:
+        limit: Optional maximum number of `<`-separated records to return
+        cursor: Optional `next_cursor` from the previous response to get the next page
+    
     Returns:
         Dict[str, Any]: A dictionary containing the raw VPNC client list string.
     """
@@ -971,7 +1557,10 @@ async def get_vpn_fusion_client_list_raw() -> Dict[str, Any]:
             data = await router.async_get_data(AsusData.VPNC_CLIENTLIST)
             if data is None:
                 return {"message": "No VPN Fusion (VPNC) client list data available."}
-            return {"vpnc_clientlist_raw": data}
+            if limit is not None or cursor is not None:
+                # Page through the `<`-separated records of the raw list
+                data = [record for record in data.split("<") if record]
+            return shape_response("vpnc_clientlist_raw", data, limit=limit, cursor=cursor)
         finally:
             await router.async_disconnect()
             await session.close()
@@ -1021,6 +1610,41 @@ async def ping_host_from_router(host: str, count: int = 4) -> Dict[str, Any]:
     except Exception as e:
         return {"error": f"Error pinging host: {str(e)}"}
 
+@mcp.tool()
+async def ping_hosts(hosts: List[str], count: int = 4, concurrency: int = 8) -> Dict[str, Any]:
+    """Ping several hosts from the router at once.
+    
+    Checks the reachability and latency of many hosts (gateways, DNS servers,
+    internal services, ...) in one call. The pings run in parallel over a single
+    router session, so a sweep takes about as long as a few single pings.
+    
+    Args:
+        hosts: Hostnames or IP addresses to ping
+        count: Number of ping packets to send to each host (default: 4)
+        concurrency: Maximum number of pings running at once (default: 8)
+    
+    Returns:
+        Dict[str, Any]: A table with one row per host: packet loss (%), average
+                        round trip time and jitter (ms), null if the host could
+                        not be checked
+    """
+    if not hosts:
+        return {"error": "No hosts to ping."}
+    try:
+        router, session = await create_router_connection()
+        try:
+            results = await router.async_ping_many(hosts, count, concurrency)
+            return {
+                "ping_results": [
+                    {"host": host, **result} for host, result in results.items()
+                ]
+            }
+        finally:
+            await router.async_disconnect()
+            await session.close()
+    except Exception as e:
+        return {"error": f"Error pinging hosts: {str(e)}"}
+
 @mcp.tool()
 async def set_parental_control_block_all(block: bool) -> Dict[str, Any]:
     """Enable or disable the 'Block All Internet Access' feature in Parental Controls.
@@ -1245,6 +1869,7 @@ async def start_firmware_upgrade() -> Dict[str, Any]:
     
     The router will download and install the latest available firmware.
     This process will involve a reboot and network downtime.
+    Use `start_job` with kind `firmware_upgrade` to follow it until the router is back.
     
     Returns:
         Dict[str, Any]: A message indicating the upgrade process was initiated.
@@ -1268,6 +1893,7 @@ async def rebuild_aimesh_network() -> Dict[str, Any]:
     
     This can help resolve connectivity issues between AiMesh nodes.
     May cause temporary network interruptions.
+    Use `start_job` with kind `aimesh_rebuild` to wait for all the nodes to be online.
     
     Returns:
         Dict[str, Any]: Confirmation that the AiMesh rebuild process was initiated.
@@ -1384,6 +2010,260 @@ async def set_wifi_radio_state(band: str, enable: bool) -> Dict[str, Any]:
     except Exception as e:
         return {"error": f"Error setting WiFi radio state: {str(e)}"}
 
+# --- Jobs ---
+# Long operations (speed test, reboot, firmware upgrade, AiMesh rebuild) run as
+# background jobs: the tool returns the job id right away and the job polls the
+# router until the operation is done, checking more rarely the longer it takes
+
+# Polling interval: the first one, growth factor and the longest one (seconds)
+JOB_POLL_INTERVAL = 2.0
+JOB_POLL_FACTOR = 1.5
+JOB_POLL_MAX_INTERVAL = 15.0
+# Number of finished jobs kept
+JOB_HISTORY = 50
+
+class JobState(str, Enum):
+    """Job state"""
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+@dataclass
+class Job:
+    """Background job"""
+    id: str
+    kind: str
+    args: Dict[str, Any]
+    state: JobState = JobState.RUNNING
+    progress: Optional[str] = None
+    result: Any = None
+    error: Optional[str] = None
+    started: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    finished: Optional[datetime] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the job status for the response"""
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "args": self.args,
+            "state": self.state.value,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "started": self.started.isoformat(),
+            "finished": self.finished.isoformat() if self.finished else None,
+        }
+
+_jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+async def _poll(
+    check: Callable[[], Any], timeout: float, wait_first: bool = False
+) -> Any:
+    """Call `check` until it returns a value other than None.
+
+    The interval between the calls grows up to JOB_POLL_MAX_INTERVAL, so that
+    quick operations finish early and long ones don't load the router"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    interval = JOB_POLL_INTERVAL
+    if wait_first:
+        await asyncio.sleep(interval)
+    while True:
+        result = await check()
+        if result is not None:
+            return result
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise TimeoutError(f"Not finished in {timeout:g} seconds")
+        await asyncio.sleep(min(interval, remaining))
+        interval = min(interval * JOB_POLL_FACTOR, JOB_POLL_MAX_INTERVAL)
+
+async def _router_down() -> Optional[bool]:
+    """Poll check for the router going down, without logging in"""
+    connection = Connection(
+        ROUTER_CONFIG["hostname"],
+        ROUTER_CONFIG["username"],
+        ROUTER_CONFIG["password"],
+        use_ssl=ROUTER_CONFIG["use_ssl"],
+    )
+    try:
+        return True if not await connection.async_probe() else None
+    finally:
+        await connection.async_close()
+
+async def _wait_restart(
+    job: Job, router: AsusRouter, timeout: float, force_identity: bool = False
+) -> float:
+    """Wait for the router to go down and come back, return the downtime"""
+    job.progress = "waiting for the router to go down"
+    await _poll(_router_down, timeout, wait_first=True)
+    down = datetime.now(timezone.utc)
+    job.progress = "waiting for the router to come back"
+    # The connection of the job is restored as soon as the router answers
+    if not await router.async_wait_online(
+        down + timedelta(seconds=timeout), force_identity=force_identity
+    ):
+        raise TimeoutError(f"Not back online in {timeout:g} seconds")
+    return (datetime.now(timezone.utc) - down).total_seconds()
+
+async def _job_speedtest(job: Job, timeout: float) -> Any:
+    """Run the speed test and wait for the new result"""
+    router, session = await create_router_connection()
+    try:
+        if not router._identity or router._identity.ookla is None:
+            await router.async_get_identity(force=True)
+        if router._identity and not router._identity.ookla:
+            raise RuntimeError("Speedtest (Ookla) is not supported by this router model or firmware")
+
+        deadline = datetime.now(timezone.utc) + timedelta(seconds=timeout)
+        async for step in router.async_run_speedtest(deadline):
+            job.progress = f"speed test step: {step.get('type')}"
+        return await router.async_get_data(AsusData.SPEEDTEST)
+    finally:
+        await router.async_disconnect()
+        await session.close()
+
+async def _job_reboot(job: Job, timeout: float) -> Any:
+    """Reboot the router and wait for it to come back"""
+    router, session = await create_router_connection()
+    try:
+        await router.async_run_service("reboot", apply=True)
+        return {"downtime": round(await _wait_restart(job, router, timeout), 1)}
+    finally:
+        await router.async_disconnect()
+        await session.close()
+
+async def _job_firmware_upgrade(job: Job, timeout: float) -> Any:
+    """Upgrade the firmware and wait for the router to come back with it"""
+    router, session = await create_router_connection()
+    try:
+        firmware = await router.async_get_data(AsusData.FIRMWARE, force=True) or {}
+        if not firmware.get("state"):
+            raise RuntimeError("No firmware update available")
+        if not await router.async_set_state(AsusState.SYSTEM, state=AsusSystem.FIRMWARE_UPGRADE):
+            raise RuntimeError("Failed to initiate firmware upgrade")
+
+        # The identity includes the firmware version
+        downtime = await _wait_restart(job, router, timeout, force_identity=True)
+        current = (await router.async_get_data(AsusData.FIRMWARE, force=True) or {}).get("current")
+        return {
+            "previous": firmware.get("current"),
+            "current": current,
+            "upgraded": current != firmware.get("current"),
+            "downtime": round(downtime, 1),
+        }
+    finally:
+        await router.async_disconnect()
+        await session.close()
+
+async def _job_aimesh_rebuild(job: Job, timeout: float) -> Any:
+    """Rebuild the AiMesh network and wait for all the nodes to be online"""
+    router, session = await create_router_connection()
+    try:
+        if not await router.async_set_state(AsusState.SYSTEM, state=AsusSystem.AIMESH_REBUILD):
+            raise RuntimeError("Failed to initiate AiMesh network rebuild")
+
+        async def check() -> Optional[Dict[str, Any]]:
+            nodes = await router.async_get_data(AsusData.AIMESH, force=True) or {}
+            online = [mac for mac, node in nodes.items() if node.status]
+            job.progress = f"{len(online)} of {len(nodes)} nodes online"
+            if nodes and len(online) == len(nodes):
+                return {"nodes": online}
+            return None
+
+        return await _poll(check, timeout, wait_first=True)
+    finally:
+        await router.async_disconnect()
+        await session.close()
+
+# Job kinds: the method and the default timeout (seconds)
+JOB_KINDS: Dict[str, Tuple[Callable[[Job, float], Awaitable[Any]], float]] = {
+    "speedtest": (_job_speedtest, 180),
+    "reboot": (_job_reboot, 300),
+    "firmware_upgrade": (_job_firmware_upgrade, 900),
+    "aimesh_rebuild": (_job_aimesh_rebuild, 600),
+}
+
+async def _run_job(job: Job, method: Callable[[Job, float], Awaitable[Any]], timeout: float) -> None:
+    """Run the job and save the result"""
+    try:
+        job.result = await method(job, timeout)
+        job.state = JobState.SUCCEEDED
+    except Exception as e:
+        job.error = str(e) or type(e).__name__
+        job.state = JobState.FAILED
+    finally:
+        job.finished = datetime.now(timezone.utc)
+        job.progress = None
+        job.task = None
+
+@mcp.tool()
+async def start_job(kind: str, args: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Start a long-running router operation in the background
+    
+    Returns the job id right away. The job checks the router until the operation
+    is done, use `get_job` to follow it. Available kinds:
+    - `speedtest`: run a speed test, the result is the new speed test data
+    - `reboot`: reboot the router, finishes when it is back online
+    - `firmware_upgrade`: install the available firmware update, finishes when
+      the router is back online, the result tells whether the firmware changed
+    - `aimesh_rebuild`: rebuild the AiMesh network, finishes when all the nodes
+      are online again
+    
+    Args:
+        kind: Kind of the job, one of the above
+        args: Optional arguments: `timeout` in seconds to wait for the operation
+    
+    Returns:
+        Dict[str, Any]: The job id and its state
+    """
+    if kind not in JOB_KINDS:
+        return {"error": f"Unknown job kind '{kind}'. Available: {', '.join(JOB_KINDS)}"}
+    args = args or {}
+    method, timeout = JOB_KINDS[kind]
+    try:
+        timeout = float(args.get("timeout", timeout))
+    except (TypeError, ValueError):
+        return {"error": f"Invalid timeout: {args.get('timeout')}"}
+
+    job = Job(id=uuid.uuid4().hex[:12], kind=kind, args=args)
+    job.task = asyncio.create_task(_run_job(job, method, timeout))
+    _jobs[job.id] = job
+
+    # Forget the oldest finished jobs
+    finished = [key for key, item in _jobs.items() if item.state != JobState.RUNNING]
+    for key in finished[: max(0, len(finished) - JOB_HISTORY)]:
+        del _jobs[key]
+
+    return {"job_id": job.id, "kind": kind, "state": job.state.value}
+
+@mcp.tool()
+async def get_job(job_id: str) -> Dict[str, Any]:
+    """Get the state of a background job
+    
+    Args:
+        job_id: The id returned by `start_job`
+    
+    Returns:
+        Dict[str, Any]: The job state (running, succeeded or failed), its progress
+                        while running and the result or error when finished
+    """
+    job = _jobs.get(job_id)
+    if job is None:
+        return {"error": f"Unknown job '{job_id}'"}
+    return job.as_dict()
+
+@mcp.tool()
+async def list_jobs() -> Dict[str, Any]:
+    """List the background jobs, running and recently finished
+    
+    Returns:
+        Dict[str, Any]: The jobs, the oldest first
+    """
+    return {"jobs": [job.as_dict() for job in _jobs.values()]}
+
 # Main execution for testing (optional)
 if __name__ == "__main__":
     # To test a specific tool:
@@ -0,0 +1,54 @@
+"""Tests for the rates module."""
+
+from asusrouter.modules.endpoint.hook import process_network_speed
+from asusrouter.modules.rates import COUNTER_32, COUNTER_64, counter_delta
+
+
+def test_counter_delta_growth():
+    """Test the difference of a growing counter."""
+
+    assert counter_delta(1500, 1000) == 500
+
+
+def test_counter_delta_wrap_32():
+    """Test a real wrap of a 32-bit counter."""
+
+    assert counter_delta(5, COUNTER_32 - 10, COUNTER_32) == 15
+
+
+def test_counter_delta_wrap_64():
+    """Test a real wrap of a 64-bit counter."""
+
+    assert counter_delta(5, COUNTER_64 - 10) == 15
+
+
+def test_counter_delta_reset_above_2_31():
+    """Test a reset of a 64-bit counter from above 2^31."""
+
+    assert counter_delta(1000, 3_000_000_000) is None
+    assert counter_delta(1000, 3_000_000_000, COUNTER_64) is None
+
+
+def test_counter_delta_reset_32():
+    """Test a reset of a 32-bit counter from the bottom half."""
+
+    assert counter_delta(1000, 2_000_000_000, COUNTER_32) is None
+
+
+def test_counter_delta_limit():
+    """Test an implausible difference for the interval."""
+
+    assert counter_delta(5, COUNTER_32 - 10, COUNTER_32, limit=10) is None
+    assert counter_delta(1010, 1000, limit=10) == 10
+
+
+def test_network_speed_reset_above_2_31():
+    """Test no speed spike after a netdev counter reset."""
+
+    network = {"wan": {"rx": 1000.0, "tx": 2000.0}}
+    prev_network = {"wan": {"rx": 3_000_000_000.0, "tx": 1000.0}}
+
+    result = process_network_speed(network, prev_network, 2.0)
+
+    assert result["wan"]["rx_speed"] == 0.0
+    assert result["wan"]["tx_speed"] == 8 * 1000 / 2.0